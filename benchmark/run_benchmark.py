@@ -0,0 +1,192 @@
+"""
+Benchmark module of HEyDU times the stages of a load manipulation run on synthetic portfolios
+
+Stages:
+    construction: Equipment objects (status and cycle stamping)
+    aggregation: Environment (load store and totals)
+    load_manipulation: Operator.load_manipulation() of every variable load
+    total_load: Operator.total_load() on a new environment (charts off)
+
+Results are written as JSON (one record per portfolio with best time of every stage) and can be compared with the
+results of a previous version (same kernel backend and resolution; portfolios are matched by devices, days, cycle
+length and seed):
+
+    python -m benchmark.run_benchmark --devices 10 100 --days 1 7 --output results.json --compare previous.json
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import argparse
+import contextlib
+import datetime as dt
+import io
+import json
+import platform
+import sys
+import time
+import numpy as np
+import pandas as pd
+import benchmark.synthetic as sy
+import load_manipulation.charts as ch
+import load_manipulation.environment as env
+import load_manipulation.kernels as kn
+import load_manipulation.models as md
+import load_manipulation.operator as op
+
+stages = ['construction', 'aggregation', 'load_manipulation', 'total_load']
+
+
+def run_portfolio(equipment, target_function, resolution=None):
+    """
+    Function to run all stages once
+    equipment: list
+        Keyword arguments of class Equipment
+    target_function: pd.DataFrame
+        Target function (not modified)
+    resolution: dt.timedelta (default None)
+        Coarse resolution of multi-resolution mode (None: whole horizon)
+    return: dict
+        Wall time of every stage [s] and curtailment [kWh]
+    """
+    result = {}
+    # Output of operator is not part of the benchmark
+    with contextlib.redirect_stdout(io.StringIO()):
+        clock = time.perf_counter()
+        load = [md.Equipment(**parameters) for parameters in equipment]
+        result['construction'] = time.perf_counter() - clock
+        clock = time.perf_counter()
+        environment = env.Environment(load)
+        result['aggregation'] = time.perf_counter() - clock
+        operator = op.Operator(environment, target_function.copy(), ch.Renderer('off'))
+        clock = time.perf_counter()
+        for i in range(len(environment.variable_load)):
+            windows = None if resolution is None else operator.coarse_windows(i, resolution)
+            operator.load_manipulation(i, False, windows=windows)
+        result['load_manipulation'] = time.perf_counter() - clock
+        result['Ref. Curtailment [kWh]'] = operator.target_func['Ref. Curtailment [kW]'].sum() / operator.axis.per_hour
+        result['Curtailment [kWh]'] = operator.target_func['Curtailment [kW]'].sum() / operator.axis.per_hour
+        load = [md.Equipment(**parameters) for parameters in equipment]
+        operator = op.Operator(env.Environment(load), target_function.copy(), ch.Renderer('off'))
+        clock = time.perf_counter()
+        operator.total_load(resolution=resolution)
+        result['total_load'] = time.perf_counter() - clock
+    return result
+
+
+def run_benchmark(devices=(10, 100), days=(1, 7), cycle_length=(5, 60), repeat=3, seed=0, resolution=None):
+    """
+    Function to run the benchmark for every combination of device count and horizon
+    devices: list (default (10, 100))
+        Numbers of equipment devices
+    days: list (default (1, 7))
+        Horizons [d]
+    cycle_length: tuple (default (5, 60))
+        Minimum and maximum cycle length [min]
+    repeat: int (default 3)
+        Runs per portfolio (best time of every stage is kept)
+    seed: int (default 0)
+        Seed of synthetic portfolios
+    resolution: dt.timedelta (default None)
+        Coarse resolution of multi-resolution mode (None: whole horizon)
+    return: dict
+        Environment of benchmark and list of results
+    """
+    results = []
+    for n_devices in devices:
+        for n_days in days:
+            equipment, target_function = sy.create_portfolio(n_devices, n_days, cycle_length, seed=seed)
+            runs = [run_portfolio(equipment, target_function, resolution) for i in range(repeat)]
+            record = {'devices': n_devices, 'days': n_days, 'cycle_length': list(cycle_length), 'seed': seed,
+                      'variable_devices': sum(parameters['manipulation_type'] is not None
+                                              for parameters in equipment)}
+            for stage in stages:
+                record[stage] = min(run[stage] for run in runs)
+            record['Ref. Curtailment [kWh]'] = runs[0]['Ref. Curtailment [kWh]']
+            record['Curtailment [kWh]'] = runs[0]['Curtailment [kWh]']
+            results.append(record)
+            print(str(n_devices) + ' devices, ' + str(n_days) + ' days: ' +
+                  ', '.join(stage + ' ' + str(round(record[stage], 3)) + ' s' for stage in stages))
+    return {'created': dt.datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+            'numpy': np.__version__, 'pandas': pd.__version__, 'kernels': kn.backend, 'repeat': repeat,
+            'resolution': None if resolution is None else resolution.total_seconds() / 60, 'results': results}
+
+
+def compare(previous, current, tolerance=0.2):
+    """
+    Function to compare benchmark results with the results of a previous version
+    previous: dict
+        Results of previous version (see run_benchmark())
+    current: dict
+        Results of current version
+    tolerance: float (default 0.2)
+        Relative slowdown of a stage that counts as regression
+    return: list
+        Regressions (portfolio, stage, previous time, current time)
+    """
+    # Runs with other kernel backend or resolution are not comparable (ValueError)
+    for setting in ('kernels', 'resolution'):
+        if previous.get(setting) != current.get(setting):
+            raise ValueError('Results not comparable: ' + setting + ' ' + str(previous.get(setting)) + ' vs. ' +
+                             str(current.get(setting)))
+    key = ('devices', 'days', 'cycle_length', 'seed')
+
+    def portfolio(record):
+        return tuple(tuple(record[k]) if k == 'cycle_length' else record[k] for k in key)
+
+    before = {portfolio(record): record for record in previous['results']}
+    regressions = []
+    for record in current['results']:
+        reference = before.get(portfolio(record))
+        if reference is None:
+            continue
+        for stage in stages:
+            if record[stage] > reference[stage] * (1 + tolerance):
+                regressions.append(({k: record[k] for k in key}, stage, reference[stage], record[stage]))
+    return regressions
+
+
+def main(argv=None):
+    """
+    Function to run the benchmark from the command line
+    return: int
+        Exit code (1: regression against --compare, 2: results of --compare not comparable)
+    """
+    parser = argparse.ArgumentParser(description='Benchmark of HEyDU load manipulation')
+    parser.add_argument('--devices', type=int, nargs='+', default=[10, 100], help='numbers of devices')
+    parser.add_argument('--days', type=int, nargs='+', default=[1, 7], help='horizons [d]')
+    parser.add_argument('--cycle-length', type=int, nargs=2, default=[5, 60], help='min. and max. cycle length [min]')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per portfolio')
+    parser.add_argument('--seed', type=int, default=0, help='seed of synthetic portfolios')
+    parser.add_argument('--kernels', choices=['numpy', 'numba'], default=None, help='kernel backend')
+    parser.add_argument('--resolution', type=int, default=None,
+                        help='coarse resolution of multi-resolution mode [min]')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON file of results')
+    parser.add_argument('--compare', default=None, help='JSON file of previous results')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='relative slowdown counted as regression')
+    args = parser.parse_args(argv)
+    if args.kernels is not None:
+        kn.set_backend(args.kernels)
+    resolution = None if args.resolution is None else dt.timedelta(minutes=args.resolution)
+    results = run_benchmark(args.devices, args.days, tuple(args.cycle_length), args.repeat, args.seed, resolution)
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    if args.compare is None:
+        return 0
+    with open(args.compare) as file:
+        previous = json.load(file)
+    try:
+        regressions = compare(previous, results, args.tolerance)
+    except ValueError as error:
+        print(error)
+        return 2
+    for portfolio, stage, before, after in regressions:
+        print('Regression ' + str(portfolio) + ' ' + stage + ': ' + str(round(before, 3)) + ' s -> ' +
+              str(round(after, 3)) + ' s')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
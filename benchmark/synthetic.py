@@ -0,0 +1,156 @@
+"""
+Synthetic module of HEyDU benchmark creates hospital portfolios without the CSVs under /data
+
+A portfolio is a list of keyword arguments of class Equipment (profile, cycle, period, base load, ...) and a target
+function with PV production and reference curtailment. Variable loads repeat their cycle several times a day on top
+of their base load; fixed loads follow a daily shape. PV production is a clear sky curve scaled by a random daily
+cloud factor and sized to the portfolio, so curtailment occurs around noon.
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import datetime as dt
+import numpy as np
+import pandas as pd
+
+# Share of manipulation types in a portfolio (as in hd_main.py: Cap, Shift and fixed loads)
+manipulation_share = {'Shift': 0.35, 'Cap': 0.35, 'Cap/Shift': 0.1, None: 0.2}
+
+
+def create_cycle(rng, length, base_load, power):
+    """
+    Function to create a load cycle
+    rng: np.random.Generator
+        Random generator
+    length: int
+        Cycle length [min]
+    base_load: float
+        Base load of equipment device [kW]
+    power: float
+        Peak power of equipment device [kW]
+    return: pd.DataFrame
+        Cycle with column P_cyc [kW]
+    """
+    # Ramp up, plateau with noise and ramp down
+    shape = np.minimum(1, np.minimum(np.arange(1, length + 1), np.arange(length, 0, -1)) / max(length / 5, 1))
+    cycle = base_load + (power - base_load) * shape * rng.uniform(0.8, 1, length)
+    index = pd.date_range('2020-01-01', periods=length, freq='min', name='Time')
+    return pd.DataFrame({'P_cyc [kW]': cycle}, index=index)
+
+
+def create_profile(rng, index, cycle, base_load, uses):
+    """
+    Function to create the reference profile of a variable load
+    rng: np.random.Generator
+        Random generator
+    index: pd.DatetimeIndex
+        Time steps
+    cycle: pd.DataFrame
+        Load cycle
+    base_load: float
+        Base load [kW]
+    uses: float
+        Mean number of cycles per day
+    return: pd.DataFrame
+        Profile with column P_ref [kW]
+    """
+    size = len(index)
+    length = len(cycle.index)
+    power = base_load - rng.uniform(0, 0.05 * base_load, size)
+    # Cycle starts on a grid of at least two cycle lengths, so cycles do not overlap
+    spacing = max(2 * length, int(1440 / max(uses, 1e-3)))
+    grid = np.arange(1, size - 2 * length, spacing)
+    starts = grid + rng.integers(0, max(spacing - 2 * length, 1), len(grid))
+    starts = starts[(rng.random(len(starts)) < min(uses * spacing / 1440, 1)) & (starts + length < size)]
+    window = starts[:, None] + np.arange(length)
+    power[window] = cycle['P_cyc [kW]'].to_numpy() * rng.uniform(0.95, 1.05, window.shape)
+    # Switched off from time to time
+    power[rng.choice(size, size // 200, replace=False)] = 0.0
+    return pd.DataFrame({'P_ref [kW]': power}, index=index)
+
+
+def create_fixed_profile(rng, index, power):
+    """
+    Function to create the profile of a fixed load (daily shape with noise)
+    rng: np.random.Generator
+        Random generator
+    index: pd.DatetimeIndex
+        Time steps
+    power: float
+        Peak power [kW]
+    return: pd.DataFrame
+        Profile with column P_ref [kW]
+    """
+    minute = np.asarray(index.hour * 60 + index.minute, dtype=float)
+    shape = 0.6 + 0.4 * np.clip(np.sin((minute - 360) / 720 * np.pi), 0, None)
+    return pd.DataFrame({'P_ref [kW]': power * shape * rng.uniform(0.9, 1, len(index))}, index=index)
+
+
+def create_portfolio(devices=10, days=1, cycle_length=(5, 60), uses=(4, 16), seed=0,
+                     start=dt.datetime(2020, 6, 1)):
+    """
+    Function to create a synthetic portfolio
+    devices: int (default 10)
+        Number of equipment devices
+    days: int (default 1)
+        Horizon [d]
+    cycle_length: tuple (default (5, 60))
+        Minimum and maximum cycle length [min]
+    uses: tuple (default (4, 16))
+        Minimum and maximum number of cycles per day
+    seed: int (default 0)
+        Seed of random generator
+    start: dt.datetime (default 2020-06-01)
+        First time step
+    return: (list, pd.DataFrame)
+        Keyword arguments of class Equipment for every device and target function
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=1440 * days, freq='min', name='Time')
+    types = list(manipulation_share)
+    kinds = rng.choice(len(types), devices, p=list(manipulation_share.values()))
+    equipment = []
+    for i in range(devices):
+        manipulation_type = types[kinds[i]]
+        power = float(rng.uniform(2, 60))
+        base_load = float(power * rng.uniform(0.05, 0.3))
+        length = int(rng.integers(cycle_length[0], cycle_length[1] + 1))
+        cycle = create_cycle(rng, length, base_load, power)
+        if manipulation_type is None:
+            profile = create_fixed_profile(rng, index, power)
+            period = dt.timedelta(0)
+            base_load = power
+        else:
+            profile = create_profile(rng, index, cycle, base_load, rng.uniform(uses[0], uses[1]))
+            period = dt.timedelta(minutes=int(rng.integers(10, 91)))
+        equipment.append({'name': 'Device ' + str(i), 'room': 'Room ' + str(i // 5), 'power': power,
+                          'manipulation_type': manipulation_type, 'profile': profile, 'cycle': cycle,
+                          'period': period, 'base_load': base_load, 'cap_factor': 0.8, 'standby': 0.0})
+    return equipment, create_target_function(rng, index, equipment)
+
+
+def create_target_function(rng, index, equipment):
+    """
+    Function to create the target function of a portfolio
+    rng: np.random.Generator
+        Random generator
+    index: pd.DatetimeIndex
+        Time steps
+    equipment: list
+        Keyword arguments of class Equipment
+    return: pd.DataFrame
+        Target function with columns PV [kW] and Ref. Curtailment [kW]
+    """
+    load = np.zeros(len(index))
+    for parameters in equipment:
+        load += parameters['profile']['P_ref [kW]'].to_numpy()
+    minute = np.asarray(index.hour * 60 + index.minute, dtype=float)
+    clear_sky = np.clip(np.sin((minute - 360) / 720 * np.pi), 0, None)
+    cloud = np.repeat(rng.uniform(0.3, 1, len(index) // 1440 + 1), 1440)[:len(index)]
+    pv = 2.5 * load.mean() * clear_sky * cloud * rng.uniform(0.9, 1, len(index))
+    # Grid feed-in limit: PV above load plus limit is curtailed
+    curtailment = pv - load - 0.2 * load.mean()
+    return pd.DataFrame({'PV [kW]': pv, 'Ref. Curtailment [kW]': curtailment}, index=index)
@@ -0,0 +1,176 @@
+"""
+Charts module of HEyDU renders line and pie charts of the operator
+
+Modes:
+    show: draw with pyplot and open a window (blocking)
+    file: render into image files on a background thread pool (non-interactive)
+    off: no charts
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+
+
+def decimate(x, y, width):
+    """
+    Function to downsample a time series to the minimum and maximum of every pixel column
+    x: np.ndarray
+        Time axis
+    y: np.ndarray
+        Values
+    width: int
+        Number of pixel columns (None: no downsampling)
+    return: (np.ndarray, np.ndarray)
+        Copies of time axis and values
+    """
+    x = np.array(x)
+    y = np.array(y)
+    if width is None or len(y) <= 2 * width:
+        return x, y
+    size = -(-len(y) // width)
+    # Repeat last value to fill the last column
+    columns = np.pad(y, (0, size * width - len(y)), mode='edge').reshape(width, size)
+    offset = np.arange(width) * size
+    index = np.sort(np.concatenate((columns.argmin(axis=1) + offset, columns.argmax(axis=1) + offset)))
+    index = np.minimum(index, len(y) - 1)
+    return x[index], y[index]
+
+
+def draw_line_chart(fig, series):
+    """
+    Function to draw a line chart of loads and curtailment
+    fig: matplotlib.figure.Figure
+        Figure to draw on
+    series: list
+        (x, y, color, label) of every line
+    """
+    ax = fig.add_subplot()
+    for x, y, color, label in series:
+        ax.plot(x, y, color, linewidth=0.8, label=label)
+    # Format axis
+    fig.autofmt_xdate()
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
+    ax.set_title('Hospital Energy Design Utility')
+    ax.set_ylabel('P [kW]')
+    ax.set_xlabel('Time [hh:mm]')
+    fig.tight_layout()
+    ax.legend(loc=2, prop={'size': 6})
+
+
+def draw_pie_chart(fig, values, labels):
+    """
+    Function to draw a pie chart
+    fig: matplotlib.figure.Figure
+        Figure to draw on
+    values: list
+        Values of pie
+    labels: list
+        Labels of pie
+    """
+    ax = fig.add_subplot()
+    ax.pie(values, labels=labels)
+    ax.axis('equal')
+
+
+class Renderer:
+    """
+    Class to render charts interactively, into files or not at all
+    """
+
+    def __init__(self, mode='show', directory='charts', workers=2, width=2000, file_format='png', dpi=150):
+        """
+        mode: str (default 'show')
+            show, file or off
+        directory: str (default 'charts')
+            Output directory of mode file
+        workers: int (default 2)
+            Number of threads rendering files
+        width: int (default 2000)
+            Number of min/max pairs per time series (None: no downsampling)
+        file_format: str (default 'png')
+            Image format of mode file
+        dpi: int (default 150)
+            Resolution of mode file
+        """
+        if mode not in ('show', 'file', 'off'):
+            raise ValueError('Unknown chart mode: ' + str(mode))
+        self.mode = mode
+        self.directory = directory
+        self.width = width
+        self.file_format = file_format
+        self.dpi = dpi
+        self.count = 0
+        self.pending = []
+        self.executor = ThreadPoolExecutor(workers) if mode == 'file' else None
+
+    def line_chart(self, name, x, series):
+        """
+        Function to render a line chart
+        name: str
+            Name of chart (file name in mode file)
+        x: np.ndarray
+            Time axis
+        series: list
+            (y, color, label) of every line; lines are downsampled to self.width
+        """
+        if self.mode == 'off':
+            return
+        lines = []
+        for y, color, label in series:
+            lines.append(decimate(x, y, self.width) + (color, label))
+        self.render(name, draw_line_chart, lines)
+
+    def pie_chart(self, name, values, labels):
+        """
+        Function to render a pie chart
+        name: str
+            Name of chart (file name in mode file)
+        values: list
+            Values of pie
+        labels: list
+            Labels of pie
+        """
+        if self.mode == 'off':
+            return
+        self.render(name, draw_pie_chart, list(values), list(labels))
+
+    def render(self, name, draw, *args):
+        """
+        Function to show a chart or submit it to the thread pool
+        """
+        if self.mode == 'show':
+            # pyplot is only needed (and only imported) for interactive charts
+            import matplotlib.pyplot as plt
+            draw(plt.figure(), *args)
+            plt.show()
+        else:
+            self.count += 1
+            path = os.path.join(self.directory, '{:03d}_{}.{}'.format(self.count, name, self.file_format))
+            self.pending.append(self.executor.submit(self.save, path, draw, *args))
+
+    def save(self, path, draw, *args):
+        """
+        Function to render a chart into a file (runs in thread pool, without pyplot)
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        fig = Figure()
+        draw(fig, *args)
+        fig.savefig(path, format=self.file_format, dpi=self.dpi)
+        return path
+
+    def wait(self):
+        """
+        Function to wait for all submitted charts
+        return: list
+            Paths of rendered files
+        """
+        pending, self.pending = self.pending, []
+        return [future.result() for future in pending]
@@ -0,0 +1,135 @@
+"""
+Compiled module of HEyDU contains Numba versions of kernels (backend numba, see kernels.set_backend())
+
+Every function loops over the time steps in the order of the NumPy kernel of the same name, so results are
+bit-identical. Importing this module requires numba.
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import numba
+import numpy as np
+
+
+@numba.njit(cache=True)
+def classify_status(power, standby, base_load, start, stop):
+    """
+    Function to classify equipment status from power samples (see kernels.classify_status())
+    """
+    status = np.empty(stop - start, dtype=np.int64)
+    for i in range(start, stop):
+        current = power[i]
+        if i == 0:
+            # First sample of the series has no predecessor: standby is checked before start
+            if current <= standby:
+                status[0] = 0
+            elif current > base_load:
+                status[0] = 2
+            else:
+                status[0] = 1
+            continue
+        previous = power[i - 1]
+        # Both comparisons are needed: a missing previous sample is neither above nor below base load
+        if current > base_load and previous > base_load:
+            status[i - start] = 3
+        elif current > base_load and previous <= base_load:
+            status[i - start] = 2
+        elif current <= standby:
+            status[i - start] = 0
+        else:
+            status[i - start] = 1
+    return status
+
+
+@numba.njit(cache=True)
+def select_starts(starts, length, size, busy):
+    """
+    Function to select the cycle starts that get a cycle (see kernels.select_starts())
+    """
+    accepted = np.empty(len(starts), dtype=np.int64)
+    count = 0
+    for start in starts:
+        if start + length <= size and start >= busy:
+            accepted[count] = start
+            count += 1
+            busy = start + length
+    return accepted[:count], busy
+
+
+@numba.njit(cache=True)
+def shift_scores(pv, total, p_out, curtailment_sum, positions, duration, period, per_hour):
+    """
+    Function to score load shifting of cycle starts (see kernels.shift_scores())
+    """
+    n = len(curtailment_sum) - 1
+    c_curtailment = np.zeros(len(positions))
+    f_curtailment = np.empty((len(positions), period))
+    for i in range(len(positions)):
+        position = positions[i]
+        value = 0.0
+        for t in range(position, position + duration):
+            current = pv[t] / per_hour - (total[t] - p_out[t]) / per_hour
+            if current < 0:
+                current = 0.0
+            value += current
+        c_curtailment[i] = value
+        for offset in range(period):
+            begin = min(position + offset, n)
+            end = min(position + offset + duration + 1, n)
+            f_curtailment[i, offset] = (curtailment_sum[end] - curtailment_sum[begin]) / per_hour
+    return c_curtailment, f_curtailment
+
+
+@numba.njit(cache=True)
+def cap_scores(p_in, status, controllable, tf_status, curtailment_sum, position, length, duration, period, factor,
+               base_load, per_hour):
+    """
+    Function to score load capping of a cycle start (see kernels.cap_scores())
+    """
+    size = len(p_in)
+    # Controllable cap durations with capped power above base load during the cycle
+    count = 0
+    while count < min(duration, size - position) and status[position + count] >= 2 and \
+            controllable[position + count] and p_in[position + count] * factor > base_load:
+        count += 1
+    durations = np.arange(1, count + 1)
+    # Energy deficit of every cap duration and its increase of current curtailment
+    deficit = np.empty(count)
+    loss = np.empty(count)
+    value = 0.0
+    increase = 0.0
+    for k in range(count):
+        energy = p_in[position + k] * (1 - factor)
+        value += energy
+        increase += energy if tf_status[position + k] == 2 else 0.0
+        deficit[k] = value
+        loss[k] = increase
+    f_curtailment = np.empty((period, count))
+    reduction = np.empty((period, count))
+    for offset in range(period):
+        for k in range(count):
+            begin = position + k + 1 + offset
+            end = begin + k + 1
+            valid = end <= size
+            begin = min(begin, size)
+            end = min(end, size)
+            # Compensation windows without manipulated time steps
+            for t in range(begin, end):
+                if not controllable[t]:
+                    valid = False
+                    break
+            # Without time steps of other cycles in window and the time step after it
+            for t in range(max(begin, position + length), min(end + 1, size)):
+                if status[t] >= 2:
+                    valid = False
+                    break
+            if valid:
+                f_curtailment[offset, k] = min(curtailment_sum[end] - curtailment_sum[begin], deficit[k]) / per_hour
+                reduction[offset, k] = f_curtailment[offset, k] - loss[k] / per_hour
+            else:
+                f_curtailment[offset, k] = 0.0
+                reduction[offset, k] = -np.inf
+    return durations, f_curtailment, reduction
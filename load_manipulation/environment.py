@@ -10,17 +10,24 @@ TODO:
 __version__ = "0.1"
 __author__ = "Paul Bohn"
 
+import numpy as np
 import pandas as pd
+import load_manipulation.instrumentation as ins
+import load_manipulation.store as st
 
 
 class Environment:
     """
     Class to display the hospital in an energetic context
     """
-    def __init__(self, load):
+    def __init__(self, load, dtype=np.float64, tolerance=1e-6):
         """
         load: list
             contains all loads
+        dtype: np.dtype (default np.float64)
+            data type of power arrays in store (e.g. np.float32)
+        tolerance: float (default 1e-6)
+            Maximum relative error of powers in dtype (see LoadStore.check_precision())
         """
         self.load = load
         # Load container
@@ -32,8 +39,14 @@ class Environment:
         self.fix_df = pd.DataFrame()
         self.load_df = pd.DataFrame()
         self.load_ref = pd.DataFrame()
+        # Arrays (running totals)
+        self.variable_total = np.array([])
+        self.fix_total = np.array([])
+        self.total = np.array([])
         # Functions
         self.get_load()
+        # Store: variable loads first, so every category is a contiguous block of rows
+        self.store = st.LoadStore(self.variable_load + self.fix_load, dtype, tolerance)
         self.summarize_load()
         self.ref_load()
 
@@ -61,8 +74,9 @@ class Environment:
         self.variable_load = priority_shift + priority_cs + priority_cap
 
     def ref_load(self):
-        self.load_ref['Reference Load'] = self.load_df['Total']
+        self.load_ref = pd.DataFrame({'Reference Load': self.total.copy()}, index=self.load_df.index)
 
+    @ins.measure('summarize_load')
     def summarize_load(self):
         """
         Function to create DataFrames from load
@@ -73,37 +87,49 @@ class Environment:
         load_df: pd.DataFrame
             Contains all loads
         """
-        # Create DataFrames
+        store = self.store
+        size = len(self.variable_load)
+        if ins.enabled:
+            ins.count('total', 'summarize_load', store.p_out.size)
+        # Calculate running totals (one reduction over contiguous rows)
+        self.variable_total = store.p_out[:size].sum(axis=0, dtype=float)
+        self.fix_total = np.nansum(store.p_ref[size:], axis=0, dtype=float)
+        self.total = self.variable_total + self.fix_total
         for i in range(len(self.variable_load)):
-            self.variable_df[self.variable_load[i].name] = self.variable_load[i].df['P_out']
-        for j in range(len(self.fix_load)):
-            self.fix_df[self.fix_load[j].name] = self.fix_load[j].df['P_ref [kW]']
-        # Concat fix_df & variable_df
-        self.load_df = pd.concat([self.variable_df, self.fix_df], axis=1)
-        # Calculate sum for each row in DataFrames
-        self.variable_df['Total'] = self.variable_df.sum(axis=1)
-        self.fix_df['Total'] = self.fix_df.sum(axis=1)
-        self.load_df['Total'] = self.load_df.sum(axis=1)
+            self.variable_load[i].p_out_changes.clear()
+        # Create DataFrames (views of store and totals)
+        variable = {store.name[i]: store.p_out[i] for i in range(size)}
+        fix = {store.name[i]: store.p_ref[i] for i in range(size, len(store.name))}
+        self.variable_df = pd.DataFrame(dict(variable, Total=self.variable_total), index=store.index, copy=False)
+        self.fix_df = pd.DataFrame(dict(fix, Total=self.fix_total), index=store.index, copy=False)
+        self.load_df = pd.DataFrame(dict(variable, **fix, Total=self.total), index=store.index, copy=False)
 
         return self.variable_df, self.fix_df, self.load_df
 
+    @ins.measure('update_load', ins.variable_load(0))
     def update_load(self, index):
         """
         Function to update summarized loads after manipulation
+        Adds the change of P_out recorded by the device (Equipment.record_p_out()) to the running totals instead of
+        summarizing all loads again. P_out written without record_p_out() requires summarize_load().
         index: int
             Position in self.variable_load
         """
-        # Remove column Total
-        variable_col = list(self.variable_df)
-        variable_col.remove('Total')
-        fix_col = list(self.fix_df)
-        fix_col.remove('Total')
-        # Add column for manipulated device
-        self.variable_df[self.variable_load[index].name] = self.variable_load[index].df['P_out']
-        # Calculate sum for each row in variable_df
-        self.variable_df['Total'] = self.variable_df[variable_col].sum(axis=1)
-        # Calculate sum for each row in load_df
-        self.load_df = pd.concat([self.variable_df[variable_col], self.fix_df[fix_col]], axis=1)
-        self.load_df['Total'] = self.load_df.sum(axis=1)
+        load = self.variable_load[index]
+        if load.p_out_changes:
+            # Restore P_out before manipulation in the changed window
+            start = min(position for position, previous in load.p_out_changes)
+            stop = max(position + len(previous) for position, previous in load.p_out_changes)
+            p_out = load.arrays['P_out'][start:stop]
+            previous_p_out = p_out.copy()
+            for position, previous in reversed(load.p_out_changes):
+                previous_p_out[position - start:position - start + len(previous)] = previous
+            load.p_out_changes.clear()
+            if ins.enabled:
+                ins.count(load.name, 'update_load', stop - start)
+            # Update totals (columns of load_df are views of store and totals)
+            delta = p_out - previous_p_out
+            self.variable_total[start:stop] += delta
+            self.total[start:stop] += delta
 
         return self.variable_df, self.fix_df, self.load_df
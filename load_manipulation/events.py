@@ -0,0 +1,174 @@
+"""
+Events module of HEyDU keeps an append-only log of load manipulations
+
+Every shift, cap, refused manipulation, fallback (optimizer or kernel backend) and curtailment result is recorded as
+a compact tuple (device, time step, action, offset, duration, energy). The log can be queried as DataFrame (table())
+and streamed to a JSON lines file by a background writer (stream()). Console output depends on the verbosity
+(set_verbosity() or environment variable HEYDU_VERBOSITY):
+    0: silent
+    1: curtailment results and fallbacks
+    2: manipulated loads and manipulations
+    3: refused manipulations and cycles at optimal time (default)
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import atexit
+import json
+import os
+import queue
+import threading
+import pandas as pd
+
+columns = ['Device', 'Time', 'Action', 'Offset', 'Duration', 'Energy [kWh]']
+verbosity = int(os.environ.get('HEYDU_VERBOSITY', 3))
+# Records: (device, time step, action, offset [time steps], duration [time steps], energy [kWh])
+records = []
+writer = None
+
+
+def set_verbosity(level):
+    """
+    Function to set the verbosity of console output
+    level: int
+        0 (silent) to 3 (all messages)
+    """
+    global verbosity
+    verbosity = int(level)
+
+
+def show(level):
+    """
+    Function to check if messages of a level are printed
+    """
+    return level <= verbosity
+
+
+def record(device, clock, action, offset=0, duration=0, energy=0.0):
+    """
+    Function to append a record to the log
+    device: str
+        Name of equipment device (total: all devices, optimizer or kernels: fallback)
+    clock: dt.datetime
+        Time step (None: whole horizon)
+    action: str
+        shift, cap, shift refused, cap refused, optimal, fallback or curtailment
+    offset: int (default 0)
+        Time steps between manipulation and compensation
+    duration: int (default 0)
+        Manipulated time steps
+    energy: float (default 0.0)
+        Energy moved [kWh] (curtailment: curtailment reduction)
+    """
+    # Built-in types (positions and sums are often NumPy scalars), so records can be written as JSON
+    entry = (device, clock, action, int(offset), int(duration), float(energy))
+    records.append(entry)
+    if writer is not None:
+        writer.put(entry)
+
+
+def table():
+    """
+    Function to create a DataFrame of the log
+    return: pd.DataFrame
+        One row per record
+    """
+    return pd.DataFrame(records, columns=columns)
+
+
+def reset():
+    """
+    Function to delete all records (the stream is kept)
+    """
+    records.clear()
+
+
+class Writer(threading.Thread):
+    """
+    Class to write records to a JSON lines file in the background
+    """
+
+    def __init__(self, path):
+        """
+        path: str
+            JSON lines file (appended)
+        """
+        super().__init__(daemon=True)
+        self.path = path
+        self.queue = queue.SimpleQueue()
+        # Records that could not be written
+        self.failed = 0
+
+    def put(self, entry):
+        """
+        Function to queue a record for writing
+        """
+        self.queue.put(entry)
+
+    def run(self):
+        """
+        Function to write queued records until None is queued
+        """
+        with open(self.path, 'a') as file:
+            while True:
+                entries = [self.queue.get()]
+                # Write everything queued in one call
+                while not self.queue.empty() and entries[-1] is not None:
+                    entries.append(self.queue.get())
+                lines = []
+                for entry in entries:
+                    if entry is None:
+                        break
+                    row = dict(zip(columns, entry))
+                    row['Time'] = None if row['Time'] is None else str(row['Time'])
+                    # A record that cannot be written is counted and skipped, the writer keeps running
+                    try:
+                        lines.append(json.dumps(row) + '\n')
+                    except (TypeError, ValueError):
+                        self.failed += 1
+                file.writelines(lines)
+                file.flush()
+                if entries[-1] is None:
+                    return
+
+    def stop(self):
+        """
+        Function to write all queued records and stop the writer
+        return: int
+            Number of records that could not be written
+        """
+        self.queue.put(None)
+        self.join()
+        return self.failed
+
+
+def stream(path):
+    """
+    Function to stream all following records to a JSON lines file
+    path: str
+        JSON lines file (appended)
+    """
+    global writer
+    close()
+    writer = Writer(path)
+    writer.start()
+
+
+@atexit.register
+def close():
+    """
+    Function to stop streaming (all queued records are written)
+    return: int
+        Number of records that could not be written (reported on console, verbosity 1)
+    """
+    global writer
+    failed = 0
+    if writer is not None:
+        failed = writer.stop()
+        if failed and show(1):
+            print('Events: ' + str(failed) + ' records not written to ' + writer.path + '.')
+        writer = None
+    return failed
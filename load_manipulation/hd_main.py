@@ -11,8 +11,8 @@ import load_manipulation.operator as op
 import load_manipulation.environment as env
 import load_manipulation.models as md
 import load_manipulation.target_function as tf
+import load_manipulation.loader as ld
 import os
-import pandas as pd
 import datetime as dt
 
 # Set directory
@@ -33,10 +33,8 @@ cycle = []
 
 # Create DataFrames from profile, cycle data
 for i in range(len(profile_name)):
-    data.append(pd.read_csv(str(profile_path + profile_name[i]), header=0, sep=';', index_col=0, decimal=','))
-    data[-1].index = pd.to_datetime(data[-1].index)
-    cycle.append(pd.read_csv(str(cycles_path + cycle_name[i]), header=0, sep=';', index_col=0, decimal=','))
-    cycle[-1].index = pd.to_datetime(cycle[-1].index)
+    data.append(ld.read_csv(str(profile_path + profile_name[i])))
+    cycle.append(ld.read_csv(str(cycles_path + cycle_name[i])))
 
 # List containers for objects
 name = ['AC Administration', 'CT', 'Washing machines', 'MRI', 'PET-CT', 'Pump station', 'Steam Generator', 'AC Theater',
@@ -64,7 +62,7 @@ for i in range(len(name)):
 environment = env.Environment(load)
 
 # Operator
-operator = op.Operator(environment, tf.target_function)
+operator = op.Operator(environment, tf.TargetFunction())
 # operator.total_load()
 operator.load_manipulation(1)
 
@@ -0,0 +1,187 @@
+"""
+Instrumentation module of HEyDU measures the stages of Operator, Environment and Equipment per device
+
+Every measured stage records calls, rows (time steps) touched, wall time and, optionally, memory allocated. Times
+are inclusive (e.g. load_manipulation contains sub_t and shift). Instrumentation is off by default (enable() or
+environment variable HEYDU_INSTRUMENT=1); measured functions then only check the flag.
+
+    ins.enable()
+    operator.total_load()
+    ins.table()                     # pd.DataFrame per device and stage
+    ins.to_json('stages.json', operator)
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import functools
+import json
+import os
+import time
+import tracemalloc
+import pandas as pd
+
+# Instrumentation on/off and memory tracing on/off
+enabled = os.environ.get('HEYDU_INSTRUMENT', '0') not in ('', '0')
+allocations = False
+# Records: (device, stage) -> [calls, rows, wall time [s], allocated memory [B]]
+records = {}
+
+
+def enable(memory=False):
+    """
+    Function to switch instrumentation on
+    memory: bool (default False)
+        Trace memory allocations (tracemalloc, slows down all Python code)
+    """
+    global enabled, allocations
+    enabled = True
+    allocations = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """
+    Function to switch instrumentation off (records are kept)
+    """
+    global enabled, allocations
+    enabled = False
+    if allocations and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    allocations = False
+
+
+def reset():
+    """
+    Function to delete all records
+    """
+    records.clear()
+
+
+def record(device, stage):
+    """
+    Function to get the record of a device and stage
+    """
+    key = (device, stage)
+    if key not in records:
+        records[key] = [0, 0, 0.0, 0]
+    return records[key]
+
+
+def count(device, stage, rows):
+    """
+    Function to add touched rows to a stage (call only if enabled)
+    device: str
+        Name of equipment device (total: all devices)
+    stage: str
+        Name of stage
+    rows: int
+        Number of rows (time steps)
+    """
+    record(device, stage)[1] += int(rows)
+
+
+def equipment(obj, *args, **kwargs):
+    """
+    Function to get the device of an Equipment method
+    """
+    return obj.name
+
+
+def variable_load(position, name='index'):
+    """
+    Function to create a function getting the device of an Operator or Environment method from its argument index
+    (position in variable_load) or load (object of class Equipment)
+    position: int
+        Position of argument (without self)
+    name: str (default 'index')
+        Name of argument
+    """
+    def device(obj, *args, **kwargs):
+        index = args[position] if len(args) > position else kwargs.get(name)
+        if index is None:
+            return 'total'
+        if hasattr(index, 'name'):
+            return index.name
+        load = obj.variable_load if hasattr(obj, 'variable_load') else obj.env.variable_load
+        return load[index].name
+    return device
+
+
+def measure(stage, device=None):
+    """
+    Function to create a decorator measuring a stage
+    stage: str
+        Name of stage
+    device: function (default None)
+        Function of the arguments of the measured function returning the device name (None: total)
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            entry = record('total' if device is None else device(*args, **kwargs), stage)
+            memory = tracemalloc.get_traced_memory()[0] if allocations else 0
+            clock = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                entry[0] += 1
+                entry[2] += time.perf_counter() - clock
+                if allocations:
+                    entry[3] += max(tracemalloc.get_traced_memory()[0] - memory, 0)
+        return wrapper
+    return decorator
+
+
+def table():
+    """
+    Function to create a table of all records
+    return: pd.DataFrame
+        Calls, rows, wall time [s] and allocated memory [B] per device and stage
+    """
+    index = pd.MultiIndex.from_tuples(list(records), names=['Device', 'Stage'])
+    df = pd.DataFrame(list(records.values()), index=index, columns=['Calls', 'Rows', 'Time [s]', 'Allocated [B]'])
+    return df.sort_index()
+
+
+def report(operator=None):
+    """
+    Function to create a report of all records and the curtailment of an operator
+    operator: object (class Operator, default None)
+        Operator of the measured run
+    return: dict
+        Stages per device and curtailment [kWh]
+    """
+    result = {}
+    if operator is not None:
+        result['Ref. Curtailment [kWh]'] = float(operator.target_func['Ref. Curtailment [kW]'].sum() /
+                                                 operator.axis.per_hour)
+        result['Curtailment [kWh]'] = float(operator.target_func['Curtailment [kW]'].sum() / operator.axis.per_hour)
+    devices = {}
+    for (device, stage), (calls, rows, seconds, memory) in sorted(records.items()):
+        devices.setdefault(device, {})[stage] = {'Calls': calls, 'Rows': rows, 'Time [s]': seconds,
+                                                 'Allocated [B]': memory}
+    result['Stages'] = devices
+    return result
+
+
+def to_json(path=None, operator=None):
+    """
+    Function to export the report as JSON
+    path: str (default None)
+        JSON file (None: return string only)
+    operator: object (class Operator, default None)
+        Operator of the measured run (adds curtailment)
+    return: str
+        JSON of report
+    """
+    text = json.dumps(report(operator), indent=2)
+    if path is not None:
+        with open(path, 'w') as file:
+            file.write(text)
+    return text
@@ -0,0 +1,381 @@
+"""
+Kernels module of HEyDU contains array routines used by models and operator
+
+Backends (set_backend() or environment variable HEYDU_KERNELS):
+    numpy: NumPy array operations
+    numba: compiled loops of module compiled (optional dependency numba); sums are sequential in both backends, so
+           results are bit-identical
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import os
+import numpy as np
+import load_manipulation.events as ev
+
+# Active backend and module of compiled kernels (None: NumPy)
+backend = 'numpy'
+compiled = None
+
+
+def set_backend(name):
+    """
+    Function to select the kernel backend
+    name: str
+        numpy or numba (falls back to numpy if numba is not installed)
+    return: str
+        Active backend
+    """
+    global backend, compiled
+    if name not in ('numpy', 'numba'):
+        raise ValueError('Unknown kernel backend: ' + str(name))
+    compiled = None
+    if name == 'numba':
+        try:
+            # numba is only needed (and only imported) for the numba backend
+            import load_manipulation.compiled as compiled
+        except ImportError:
+            ev.record('kernels', None, 'fallback')
+            if ev.show(1):
+                print('Kernels: numba not installed. NumPy backend.')
+            name = 'numpy'
+    backend = name
+    return backend
+
+
+set_backend(os.environ.get('HEYDU_KERNELS', 'numpy'))
+
+
+def classify_status(power, standby, base_load, start=0, stop=None):
+    """
+    Function to classify equipment status from power samples
+    power: np.ndarray
+        Power of equipment device
+    standby: float
+        Standby load of equipment device
+    base_load: float
+        Base load of equipment device
+    start: int (default 0)
+        First position to classify
+    stop: int (default None)
+        Position after the last one to classify (None: end of power)
+    status:
+        0: standby
+        1: base load
+        2: start
+        3: running
+    """
+    power = np.asarray(power, dtype=float)
+    if stop is None:
+        stop = len(power)
+    if compiled is not None:
+        return compiled.classify_status(power, float(standby), float(base_load), start, stop)
+    current = power[start:stop]
+    previous = power[max(start - 1, 0):max(stop - 1, 0)]
+    if start == 0:
+        previous = np.concatenate(([np.nan], previous))[:len(current)]
+    high = current > base_load
+    # Both comparisons are needed: a missing previous sample is neither above nor below base load
+    status = np.where(high & (previous > base_load), 3,
+                      np.where(high & (previous <= base_load), 2, np.where(current <= standby, 0, 1)))
+    # First sample of the series has no predecessor: standby is checked before start
+    if start == 0 and len(current) > 0:
+        if current[0] <= standby:
+            status[0] = 0
+        elif high[0]:
+            status[0] = 2
+        else:
+            status[0] = 1
+    return status
+
+
+def stamp_cycles(status, cycle, base_load):
+    """
+    Function to write the load cycle at every cycle start
+    status: np.ndarray
+        Status of equipment device (see classify_status)
+    cycle: np.ndarray
+        Power of one use [kW]
+    base_load: float
+        Base load of equipment device (status 1)
+    Cycle starts inside a running cycle are part of that cycle. Cycle starts too close to the end of the horizon
+    for a whole cycle are set to base load.
+    return: (np.ndarray, np.ndarray)
+        status and P_in
+    """
+    status = np.array(status, dtype=np.int64)
+    cycle = np.asarray(cycle, dtype=float)
+    starts = np.flatnonzero(status == 2)
+    # Truncated cycles at the end of the horizon
+    status[starts[starts + len(cycle) > len(status)]] = 1
+    starts = select_starts(starts, len(cycle), len(status))[0]
+    p_in = np.where(status == 1, base_load, 0.0)
+    write_cycles(status, p_in, starts, cycle)
+    return status, p_in
+
+
+def select_starts(starts, length, size, busy=0):
+    """
+    Function to select the cycle starts that get a cycle
+    starts: np.ndarray
+        Positions with status 2 (ascending)
+    length: int
+        Cycle length
+    size: int
+        Length of horizon; cycles have to end within the horizon
+    busy: int (default 0)
+        End of the last selected cycle before starts
+    Starts inside the cycle of a previous start are part of that cycle.
+    return: (np.ndarray, int)
+        Selected starts and end of the last selected cycle
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    if compiled is not None:
+        return compiled.select_starts(starts, int(length), int(size), int(busy))
+    starts = starts[starts + length <= size]
+    if len(starts) > 0 and (starts[0] < busy or np.any(np.diff(starts) < length)):
+        accepted = []
+        for start in starts:
+            if start >= busy:
+                accepted.append(start)
+                busy = start + length
+        starts = np.array(accepted, dtype=np.int64)
+    if len(starts) > 0:
+        busy = max(busy, starts[-1] + length)
+    return starts, busy
+
+
+def write_cycles(status, p_in, starts, cycle, offset=0):
+    """
+    Function to write cycles into status and P_in (in place, with broadcast assignment)
+    status: np.ndarray
+        Status of equipment device
+    p_in: np.ndarray
+        Power of equipment device
+    starts: np.ndarray
+        Positions of cycle starts (see select_starts)
+    cycle: np.ndarray
+        Power of one use [kW]
+    offset: int (default 0)
+        Position of the first array element in the horizon; cycles outside the arrays are clipped
+    """
+    cycle = np.asarray(cycle, dtype=float)
+    if len(starts) == 0 or len(cycle) == 0:
+        return
+    window = np.asarray(starts, dtype=np.int64)[:, None] - offset + np.arange(len(cycle))
+    inside = (window >= 0) & (window < len(status))
+    p_in[window[inside]] = np.broadcast_to(cycle, window.shape)[inside]
+    status[window[:, 1:][inside[:, 1:]]] = 3
+    status[window[:, 0][inside[:, 0]]] = 2
+
+
+def cumulative_sum(values):
+    """
+    Function to create prefix sums for window sums
+    values: np.ndarray
+        Time series (e.g. curtailment [kW])
+    return: np.ndarray
+        Prefix sums with leading zero (length len(values) + 1)
+    """
+    return np.concatenate(([0.0], np.cumsum(np.asarray(values, dtype=float))))
+
+
+def window_sums(cumsum, starts, length):
+    """
+    Function to sum windows of a time series from its prefix sums
+    cumsum: np.ndarray
+        Prefix sums (see cumulative_sum)
+    starts: np.ndarray
+        Window start positions (any shape)
+    length: int
+        Window length; windows are clipped at the end of the time series
+    """
+    n = len(cumsum) - 1
+    starts = np.asarray(starts)
+    return cumsum[np.minimum(starts + length, n)] - cumsum[np.minimum(starts, n)]
+
+
+def run_lengths(values):
+    """
+    Function to encode a time series as runs of equal values
+    values: np.ndarray
+        Time series (e.g. status)
+    return: (np.ndarray, np.ndarray, np.ndarray)
+        First position, position after the last one and value of every run
+    """
+    values = np.asarray(values)
+    change = np.flatnonzero(values[1:] != values[:-1]) + 1
+    starts = np.concatenate(([0], change)) if len(values) else np.zeros(0, dtype=np.int64)
+    stops = np.concatenate((change, [len(values)])) if len(values) else np.zeros(0, dtype=np.int64)
+    return starts, stops, values[starts]
+
+
+def intersect_runs(starts, stops, other_starts, other_stops):
+    """
+    Function to intersect two lists of sorted, disjoint runs; adjacent results are merged
+    starts, stops: np.ndarray
+        Runs (first position, position after the last one)
+    other_starts, other_stops: np.ndarray
+        Other runs
+    return: (np.ndarray, np.ndarray)
+        Runs covered by both lists
+    """
+    # Other runs overlapping every run: other_stops > start and other_starts < stop
+    first = np.searchsorted(other_stops, starts, side='right')
+    count = np.maximum(np.searchsorted(other_starts, stops, side='left') - first, 0)
+    row = np.repeat(np.arange(len(starts)), count)
+    column = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count) + np.repeat(first, count)
+    begin = np.maximum(starts[row], other_starts[column])
+    end = np.minimum(stops[row], other_stops[column])
+    # Merge runs that continue the previous one
+    new = np.concatenate(([True], begin[1:] != end[:-1])) if len(begin) else np.zeros(0, dtype=bool)
+    last = np.concatenate((np.flatnonzero(new)[1:] - 1, [len(end) - 1])) if len(begin) else np.zeros(0, dtype=int)
+    return begin[new], end[last]
+
+
+def coarse_blocks(values, block):
+    """
+    Function to aggregate a boolean time series to blocks (block is True if any time step is True)
+    values: np.ndarray
+        Time series (bool)
+    block: int
+        Time steps per block; the last block may be shorter
+    return: np.ndarray
+        One value per block
+    """
+    values = np.asarray(values, dtype=bool)
+    blocks = -(-len(values) // block)
+    padded = np.zeros(blocks * block, dtype=bool)
+    padded[:len(values)] = values
+    return padded.reshape(blocks, block).any(axis=1)
+
+
+def coarse_windows(starts, curtailment, block, reach):
+    """
+    Function to find windows of cycle starts with curtailment in reach on a coarse grid
+    starts: np.ndarray
+        Time steps of cycles that are or can become cycle starts to be visited (bool)
+    curtailment: np.ndarray
+        Curtailment [kW]
+    block: int
+        Time steps per block of coarse grid
+    reach: int
+        Time steps after a cycle start that can take part in its manipulation (cycle and compensation)
+    return: list
+        (start, stop) positions of windows; blocks of cycle starts without curtailment from their block up to reach
+        are left out, adjacent blocks are merged
+    """
+    size = len(curtailment)
+    active = coarse_blocks(starts, block)
+    curtailed = cumulative_sum(coarse_blocks(np.asarray(curtailment) > 0, block))
+    # A cycle start in block b reaches into block b + ceil(reach / block) at most
+    first = np.arange(len(active))
+    last = np.minimum(first + 1 + -(-reach // block), len(active))
+    active &= curtailed[last] - curtailed[first] > 0
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], active.astype(np.int8), [0]))))
+    return [(int(begin) * block, min(int(end) * block, size)) for begin, end in zip(edges[::2], edges[1::2])]
+
+
+def shift_scores(pv, total, p_out, curtailment_sum, positions, duration, period, per_hour=60):
+    """
+    Function to score load shifting of cycle starts (see Operator.shift_offsets())
+    pv: np.ndarray
+        PV production [kW]
+    total: np.ndarray
+        Total load [kW]
+    p_out: np.ndarray
+        Power of shifted load [kW]
+    curtailment_sum: np.ndarray
+        Prefix sums of curtailment [kW]
+    positions: np.ndarray
+        Cycle starts
+    duration: int
+        Cycle length
+    period: int
+        Number of compensation offsets
+    per_hour: float (default 60)
+        Time steps per hour
+    return: (np.ndarray, np.ndarray)
+        Current curtailment without the load during its cycle [kWh] and curtailment of the compensation window
+        (including its last time step) of every offset [kWh]
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    if compiled is not None:
+        return compiled.shift_scores(pv, total, p_out, curtailment_sum, positions, int(duration), int(period),
+                                     float(per_hour))
+    window = positions[:, None] + np.arange(duration)
+    c_curtailment = pv[window] / per_hour - (total[window] - p_out[window]) / per_hour
+    c_curtailment = np.where(c_curtailment < 0, 0, c_curtailment)
+    # Sequential sum (np.cumsum), identical to compiled kernel
+    c_curtailment = np.cumsum(c_curtailment, axis=1)[:, -1] if duration > 0 else np.zeros(len(positions))
+    f_curtailment = window_sums(curtailment_sum, positions[:, None] + np.arange(period), duration + 1) / per_hour
+    return c_curtailment, f_curtailment
+
+
+def cap_scores(p_in, status, controllable, tf_status, curtailment_sum, position, length, duration, period, factor,
+               base_load, per_hour=60):
+    """
+    Function to score load capping of a cycle start for every cap duration and compensation offset (see
+    Operator.cap_offsets())
+    p_in: np.ndarray
+        Power of capped load [kW]
+    status: np.ndarray
+        Status of capped load
+    controllable: np.ndarray
+        Controllability of capped load (bool)
+    tf_status: np.ndarray
+        Status of target function
+    curtailment_sum: np.ndarray
+        Prefix sums of curtailment [kW]
+    position: int
+        Cycle start
+    length: int
+        Cycle length
+    duration: int
+        Maximum cap duration
+    period: int
+        Number of compensation offsets
+    factor: float
+        percentile for load capping
+    base_load: float
+        Base load of capped load
+    per_hour: float (default 60)
+        Time steps per hour
+    return: (np.ndarray, np.ndarray, np.ndarray)
+        Cap durations (controllable, capped power above base load), curtailment reduced by compensation [kWh] and
+        reduction of curtailment [kWh] (-inf: compensation window exceeds horizon, is not controllable or overlaps
+        another cycle) of every offset and duration
+    """
+    if compiled is not None:
+        return compiled.cap_scores(p_in, status, controllable, tf_status, curtailment_sum, int(position), int(length),
+                                   int(duration), int(period), float(factor), float(base_load), float(per_hour))
+    size = len(p_in)
+    window = position + np.arange(min(duration, size - position))
+    # Float64 arithmetic for float32 stores as in compiled kernel
+    power = p_in[window].astype(float)
+    feasible = np.cumprod((status[window] >= 2) & controllable[window] & (power * factor > base_load)).astype(bool)
+    durations = np.arange(1, len(window) + 1)[feasible]
+    # Energy deficit of every cap duration and its increase of current curtailment
+    deficit = cumulative_sum(power * (1 - factor))[durations]
+    loss = cumulative_sum(np.where(tf_status[window] == 2, power * (1 - factor), 0))[durations]
+    # Compensation windows (offset x duration) inside the horizon
+    begin = position + durations + np.arange(period)[:, None]
+    end = begin + durations
+    valid = end <= size
+    begin = np.minimum(begin, size)
+    end = np.minimum(end, size)
+    # Without manipulated time steps, time steps of other cycles in window and the time step after it (a cycle start
+    # directly after the window would continue the compensation): cycle time steps after the own cycle
+    after = np.minimum(end + 1, size)
+    other = np.minimum(np.maximum(begin, position + length), after)
+    last = int(after.max()) if after.size else position
+    cycle = cumulative_sum(status[position:last] >= 2)
+    manipulated = cumulative_sum(~controllable[position:last])
+    valid &= (cycle[after - position] - cycle[other - position] == 0) & \
+        (manipulated[end - position] - manipulated[begin - position] == 0)
+    f_curtailment = np.where(valid, np.minimum(curtailment_sum[end] - curtailment_sum[begin], deficit), 0) / per_hour
+    reduction = np.where(valid, f_curtailment - loss / per_hour, -np.inf)
+    return durations, f_curtailment, reduction
@@ -0,0 +1,164 @@
+"""
+Loader module of HEyDU reads profile, cycle and target function CSVs through a binary cache
+
+The first read of a CSV parses it with pandas and writes one .npy file per column (plus the time index) to the cache.
+Later reads memory-map these files. The cache is keyed by modification time and size of the source file, and by a
+hash of its content when the modification time changed.
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Format of the semicolon separated, comma decimal CSVs of HEyDU
+csv_format = {'header': 0, 'sep': ';', 'index_col': 0, 'decimal': ','}
+
+
+def file_hash(path):
+    """
+    Function to calculate the content hash of a file
+    path: str
+        Path of file
+    """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def cache_path(path, cache_dir=None):
+    """
+    Function to get the cache directory of a CSV
+    path: str
+        Path of CSV
+    cache_dir: str (default None)
+        Cache root (None: directory .heydu_cache next to the CSV)
+    """
+    path = os.path.abspath(path)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(path), '.heydu_cache')
+    key = hashlib.sha256(path.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, os.path.basename(path) + '-' + key)
+
+
+def read_csv(path, cache_dir=None, cache=True, **kwargs):
+    """
+    Function to read a CSV with time index (memory-mapped from cache if up to date)
+    path: str
+        Path of CSV
+    cache_dir: str (default None)
+        Cache root (None: directory .heydu_cache next to the CSV)
+    cache: bool (default True)
+        Use binary cache; False: parse CSV only
+    kwargs:
+        Arguments of pd.read_csv (default: csv_format)
+    return: pd.DataFrame
+        Numeric columns with pd.DatetimeIndex (read-only arrays if memory-mapped)
+    """
+    options = dict(csv_format, **kwargs)
+    if not cache:
+        return parse_csv(path, options)
+    directory = cache_path(path, cache_dir)
+    stat = os.stat(path)
+    meta = read_meta(directory)
+    if meta is not None and meta['options'] == json.loads(json.dumps(options, default=str)):
+        if meta['mtime_ns'] == stat.st_mtime_ns and meta['size'] == stat.st_size:
+            return load_cache(directory, meta)
+        if meta['size'] == stat.st_size and meta['sha256'] == file_hash(path):
+            # File touched but unchanged
+            meta['mtime_ns'] = stat.st_mtime_ns
+            write_meta(directory, meta)
+            return load_cache(directory, meta)
+    df = parse_csv(path, options)
+    write_cache(directory, df, {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': file_hash(path),
+                                'options': options})
+    meta = read_meta(directory)
+    return df if meta is None else load_cache(directory, meta)
+
+
+def parse_csv(path, options):
+    """
+    Function to parse a CSV with pandas and convert its index to datetime
+    path: str
+        Path of CSV
+    options: dict
+        Arguments of pd.read_csv
+    """
+    df = pd.read_csv(path, **options)
+    df.index = pd.to_datetime(df.index)
+    return df
+
+
+def read_meta(directory):
+    """
+    Function to read the meta data of a cache entry (None: no valid entry)
+    directory: str
+        Cache directory of CSV
+    """
+    try:
+        with open(os.path.join(directory, 'meta.json')) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_meta(directory, meta):
+    """
+    Function to write the meta data of a cache entry
+    directory: str
+        Cache directory of CSV
+    meta: dict
+        Meta data
+    """
+    with open(os.path.join(directory, 'meta.json'), 'w') as file:
+        json.dump(meta, file, default=str)
+
+
+def write_cache(directory, df, meta):
+    """
+    Function to write a DataFrame as one .npy file per column; DataFrames with non-numeric columns are not cached
+    directory: str
+        Cache directory of CSV
+    df: pd.DataFrame
+        Parsed CSV
+    meta: dict
+        Meta data of source file
+    """
+    if not all(pd.api.types.is_numeric_dtype(df[column]) for column in df.columns):
+        shutil.rmtree(directory, ignore_errors=True)
+        return
+    os.makedirs(os.path.dirname(directory), exist_ok=True)
+    # Write to temporary directory and replace the entry, so readers never see a partial cache
+    temporary = tempfile.mkdtemp(dir=os.path.dirname(directory))
+    np.save(os.path.join(temporary, 'index.npy'), df.index.to_numpy(dtype='datetime64[ns]'))
+    for i in range(len(df.columns)):
+        np.save(os.path.join(temporary, str(i) + '.npy'), df[df.columns[i]].to_numpy())
+    meta = dict(meta, columns=[str(column) for column in df.columns], index_name=df.index.name)
+    write_meta(temporary, meta)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(temporary, directory)
+
+
+def load_cache(directory, meta):
+    """
+    Function to create a DataFrame from memory-mapped cache files
+    directory: str
+        Cache directory of CSV
+    meta: dict
+        Meta data
+    """
+    index = pd.DatetimeIndex(np.load(os.path.join(directory, 'index.npy'), mmap_mode='r'), name=meta['index_name'])
+    columns = {}
+    for i in range(len(meta['columns'])):
+        columns[meta['columns'][i]] = np.load(os.path.join(directory, str(i) + '.npy'), mmap_mode='r')
+    return pd.DataFrame(columns, index=index, copy=False)
@@ -8,6 +8,12 @@ __version__ = "0.1"
 __author__ = "Paul Bohn"
 
 import datetime as dt
+import numpy as np
+import pandas as pd
+import load_manipulation.events as ev
+import load_manipulation.instrumentation as ins
+import load_manipulation.kernels as kn
+import load_manipulation.timeaxis as ta
 
 
 class Hospital:
@@ -15,6 +21,9 @@ class Hospital:
     Class to create hospital
     """
 
+    __slots__ = ('user', 'name', 'location', 'area', 'building', 'employees', 'patients', 'department',
+                 'all_equipment')
+
     def __init__(self, user, name, location, employees, patients, area, building):
         """
         user: str
@@ -56,6 +65,8 @@ class Department(object):
     Class to create hospital departments
     """
 
+    __slots__ = ('name', 'area', 'employees', 'patients', 'room')
+
     def __init__(self, name, area, employees, patients):
         """
         name: str
@@ -79,6 +90,8 @@ class Room:
     Class to create rooms
     """
 
+    __slots__ = ('name', 'area', 'department', 'equipment')
+
     def __init__(self, name, area, department):
         """
         name: str
@@ -99,6 +112,15 @@ class Equipment:
     Class to create equipment
     """
 
+    __slots__ = ('name', 'room', 'power', 'manipulation_type', 'df', 'arrays', 'store', 'row', 'cycle', 'period',
+                 'base_load', 'standby', 'cap_factor', 'timestep', 'on', 'p_out_changes', 'status_changed',
+                 # Cycle statistics (see update_cycle())
+                 'axis', 'cycle_power', 'cycle_duration', 'cycle_energy', 'period_steps', 'cap_feasible', 'cap_steps',
+                 'cycle_steps')
+
+    # Parameters of cycle statistics: setting one of them refreshes the statistics (see update_cycle())
+    cycle_parameters = ('cycle', 'period', 'base_load', 'cap_factor', 'timestep')
+
     def __init__(self, name, room, power, manipulation_type, profile, cycle, period, base_load, cap_factor=1, standby=0,
                  timestep=dt.timedelta(minutes=1)):
         """
@@ -129,27 +151,117 @@ class Equipment:
         self.power = power
         self.manipulation_type = manipulation_type
         self.df = profile
+        self.arrays = {}
+        self.store = None
+        self.row = None
         self.cycle = cycle
         self.period = period
         self.base_load = base_load
         self.standby = standby
         self.cap_factor = cap_factor
         self.timestep = timestep
-        # Dataframes
-        self.df['Status'] = 0
-        self.df['Controllable'] = True
+        self.update_cycle()
+        # Arrays (backing self.df)
+        size = len(profile.index)
+        arrays = {'P_ref [kW]': profile['P_ref [kW]'].to_numpy(dtype=float, copy=True),
+                  'Status': np.zeros(size, dtype=np.int8), 'Controllable': np.ones(size, dtype=bool)}
+        if manipulation_type is not None:
+            arrays['P_in'] = np.zeros(size)
+            arrays['P_out'] = np.zeros(size)
+        self.bind(arrays)
         # Lists
         self.on = []
+        self.p_out_changes = []
+        # Positions (start, stop) with refreshed status since last check by operator
+        self.status_changed = None
         # Functions
         self.update_status('P_ref [kW]')
         self.create_profile()
         self.p_out()
 
-    def update_status(self, column):
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # Statistics exist after all cycle parameters are set in __init__
+        if name in self.cycle_parameters and hasattr(self, 'cycle_steps'):
+            self.update_cycle()
+
+    def update_cycle(self):
+        """
+        Function to precompute statistics of cycle and parameters (refreshed when cycle, period, base_load, cap_factor
+        or timestep is set; changes inside the cycle DataFrame require a new assignment of cycle)
+        cycle_power: np.ndarray
+            Power of cycle [kW]
+        cycle_steps: int
+            Cycle length [time steps]
+        cycle_duration: dt.timedelta
+            Cycle length
+        cycle_energy: float
+            Energy of one cycle [kWh]
+        period_steps: int
+            Max. time for load compensation [time steps]
+        cap_feasible: np.ndarray
+            Time steps of cycle with capped power above base load (bool)
+        cap_steps: int
+            Longest cap duration from cycle start [time steps]
+        axis: object (class TimeAxis)
+            Positions of profile with resolution timestep
+        """
+        cycle_power = self.cycle['P_cyc [kW]'].to_numpy(dtype=float)
+        cap_feasible = cycle_power * self.cap_factor > self.base_load
+        self.axis = ta.TimeAxis.from_index(self.df.index, self.timestep)
+        self.cycle_power = cycle_power
+        self.cycle_duration = self.axis.duration(len(cycle_power))
+        self.cycle_energy = float(cycle_power.sum()) / self.axis.per_hour
+        self.period_steps = self.axis.steps(self.period)
+        self.cap_feasible = cap_feasible
+        self.cap_steps = int(np.cumprod(cap_feasible).sum())
+        # Assigned last: __setattr__ refreshes the statistics only if cycle_steps is set, i.e. all of them are
+        self.cycle_steps = len(cycle_power)
+
+    def bind(self, arrays):
+        """
+        Function to back self.df with arrays (zero-copy)
+        arrays: dict
+            Column name and np.ndarray; further columns of self.df are kept
+        """
+        columns = {column: self.df[column].to_numpy() for column in self.df.columns}
+        columns.update(arrays)
+        self.arrays = arrays
+        self.df = pd.DataFrame(columns, index=self.df.index, copy=False)
+
+    def attach(self, store, row):
+        """
+        Function to move data of equipment device into a shared store (see class LoadStore)
+        store: object (class LoadStore)
+            Shared arrays of all loads
+        row: int
+            Row of equipment device in store
+        """
+        store.p_ref[row] = self.arrays['P_ref [kW]']
+        store.status[row] = self.arrays['Status']
+        store.controllable[row] = self.arrays['Controllable']
+        if self.manipulation_type is None:
+            # Fixed load: P_out of the store holds the reference profile
+            store.p_in[row] = self.arrays['P_ref [kW]']
+            store.p_out[row] = self.arrays['P_ref [kW]']
+        else:
+            store.p_in[row] = self.arrays['P_in']
+            store.p_out[row] = self.arrays['P_out']
+        self.store = store
+        self.row = row
+        self.bind(store.arrays(row, self.manipulation_type is not None))
+
+    @ins.measure('update_status', ins.equipment)
+    def update_status(self, column, start=0, stop=None):
         """
         Function to write equipment status
         column: String
             Column name in self.df
+        start: int (default 0)
+            Position of the first changed sample
+        stop: int (default None)
+            Position after the last changed sample (None: end of profile)
+            Status depends on the previous sample, so the position at stop is refreshed as well.
         status:
             0: standby
             1: base load
@@ -159,29 +271,20 @@ class Equipment:
         if self.manipulation_type is None:
             pass
         else:
-            for i in range(len(self.df.index)):
-                current_status = self.df.loc[self.df.index[i], 'Status']
-                current_power = self.df.loc[self.df.index[i], column]
-                if i == 0:
-                    if current_power <= self.standby:
-                        current_status = 0
-                    elif current_power > self.base_load:
-                        current_status = 2
-                    else:
-                        current_status = 1
-                else:
-                    if current_power > self.base_load \
-                            and self.df.loc[self.df.index[i - 1], column] > self.base_load:
-                        current_status = 3
-                    elif current_power > self.base_load \
-                            and self.df.loc[self.df.index[i - 1], column] <= self.base_load:
-                        current_status = 2
-                    elif current_power <= self.standby:
-                        current_status = 0
-                    else:
-                        current_status = 1
-                self.df.loc[self.df.index[i], 'Status'] = current_status
+            if stop is None:
+                stop = len(self.df.index)
+            else:
+                stop = min(stop + 1, len(self.df.index))
+            power = self.arrays[column] if column in self.arrays else self.df[column].to_numpy()
+            self.arrays['Status'][start:stop] = kn.classify_status(power, self.standby, self.base_load, start, stop)
+            if ins.enabled:
+                ins.count(self.name, 'update_status', stop - start)
+            if self.status_changed is not None:
+                start = min(start, self.status_changed[0])
+                stop = max(stop, self.status_changed[1])
+            self.status_changed = (start, stop)
 
+    @ins.measure('create_profile', ins.equipment)
     def create_profile(self):
         """
         Function to create load profiles from status with cycle
@@ -189,32 +292,25 @@ class Equipment:
         if self.manipulation_type is None:
             pass
         else:
-            for j in range(len(self.df.index)):
-                # Check when device status is ON
-                if self.df.loc[self.df.index[j], 'Status'] == 2:
-                    # Check if remaining length is longer than cycle
-                    if len(self.df.index) - j >= len(self.cycle.index):
-                        for i in range(len(self.cycle.index)):
-                            if i == 0:
-                                self.df.loc[self.df.index[j + i], 'Status'] = 2
-                                self.df.loc[self.df.index[j + i], 'P_in'] = self.cycle.loc[
-                                    self.cycle.index[i], 'P_cyc [kW]']
-                            else:
-                                self.df.loc[self.df.index[j + i], 'Status'] = 3
-                                self.df.loc[self.df.index[j + i], 'P_in'] = self.cycle.loc[
-                                    self.cycle.index[i], 'P_cyc [kW]']
-                                k = j + i + 1
-                    else:
-                        while self.df.loc[self.df.index[k], 'Status'] == 3:
-                            self.df.loc[self.df.index[k], 'Status'] = 1
-                            k += 1
-                elif self.df.loc[self.df.index[j], 'Status'] == 1 or len(self.df.index) - j < len(self.cycle.index):
-                    self.df.loc[self.df.index[j], 'P_in'] = self.base_load
-            self.df['P_in'].fillna(0, inplace=True)
+            status, p_in = kn.stamp_cycles(self.arrays['Status'], self.cycle_power, self.base_load)
+            self.arrays['Status'][:] = status
+            self.arrays['P_in'][:] = p_in
+            if ins.enabled:
+                ins.count(self.name, 'create_profile', len(p_in))
 
     def p_out(self):
         if self.manipulation_type is not None:
-            self.df['P_out'] = self.df['P_in']
+            self.arrays['P_out'][:] = self.arrays['P_in']
+
+    def record_p_out(self, position, length):
+        """
+        Function to keep P_out before it is overwritten (applied to running totals by Environment.update_load())
+        position: int
+            first time step to be overwritten
+        length: int
+            number of time steps to be overwritten
+        """
+        self.p_out_changes.append((position, self.arrays['P_out'][position:position + length].copy()))
 
     def shift(self, clock, step):
         """
@@ -224,95 +320,112 @@ class Equipment:
         step: dt.timedelta
             time difference for load shifting
         """
-        if self.df.loc[clock, 'Status'] != 2:
-            print('Load shifting not possible. Choose time when cycle starts.')
-        elif not self.df.loc[clock, 'Controllable']:
-            print('Load shifting not possible. Load already manipulated.')
-        else:
-            """Check if new cycle starts during process"""
-            status_check = []
-            for i in range(len(self.cycle.index)):
-                if self.df.loc[clock + step + dt.timedelta(minutes=i), 'Status'] == 2:
-                    status_check.append(True)
-                else:
-                    status_check.append(False)
-            if True in status_check:
-                print('Cycle starts during load shifting. Choose different parameters.')
-            else:
-                """Load shifting"""
-                # delta = dt.timedelta(minutes=len(self.cycle.index))
-                # self.df.loc[clock:clock + delta, 'P_out'] = self.base_load
-                # self.df.loc[clock + step: clock + step + delta, 'P_out'] = self.df.loc[clock:clock + delta, 'P_in']
-                # self.df.loc[clock + step: clock + step + delta, 'Controllable'] = False
-                for j in range(len(self.cycle.index)):
-                    delta_j = dt.timedelta(minutes=j)
-                    self.df.loc[clock + delta_j, 'P_out'] = self.base_load
-                for k in range(len(self.cycle.index)):
-                    delta_k = dt.timedelta(minutes=k)
-                    self.df.loc[clock + step + delta_k, 'P_out'] = self.df.loc[clock + delta_k, 'P_in']
-                    self.df.loc[clock + step + delta_k, 'Controllable'] = False
-        self.update_status('P_out')
+        self.shift_at(self.axis.position(clock), self.axis.steps(step))
         return self.df['P_out']
 
+    @ins.measure('shift', ins.equipment)
+    def shift_at(self, position, offset):
+        """
+        Function to shift load (positions, see shift())
+        position: int
+            cycle start
+        offset: int
+            time steps for load shifting
+        return: bool
+            Load shifted
+        """
+        target = position + offset
+        length = self.cycle_steps
+        status = self.arrays['Status']
+        message = None
+        if status[position] != 2:
+            message = 'Load shifting not possible. Choose time when cycle starts.'
+        elif not self.arrays['Controllable'][position]:
+            message = 'Load shifting not possible. Load already manipulated.'
+        elif target + length > len(status):
+            message = 'Load shifting not possible. Cycle exceeds time horizon.'
+        # Check if new cycle starts during process
+        elif np.any(status[target:target + length] == 2):
+            message = 'Cycle starts during load shifting. Choose different parameters.'
+        else:
+            # Load shifting
+            ev.record(self.name, self.axis.clock(position), 'shift', offset, length, self.cycle_energy)
+            self.record_p_out(position, length)
+            self.record_p_out(target, length)
+            self.arrays['P_out'][position:position + length] = self.base_load
+            self.arrays['P_out'][target:target + length] = self.arrays['P_in'][position:position + length]
+            self.arrays['Controllable'][target:target + length] = False
+            self.update_status('P_out', position, target + length)
+            if ins.enabled:
+                ins.count(self.name, 'shift', 2 * length)
+        if message is not None:
+            ev.record(self.name, self.axis.clock(position), 'shift refused', offset, length)
+            if ev.show(3):
+                print(message)
+        return message is None
+
     def cap(self, clock, step, time, factor):
         """
         Function for load capping
         clock: dt.datetime
             time from operator
-        time: integer
+        time: dt.timedelta
             time span during load is capped
-        step: dt.datetime
+        step: dt.timedelta
             time difference between capping and compensation
         factor: float
             percentile for load capping
         """
-        if self.df.loc[clock, 'Status'] != 2:
-            print('Load shifting not possible. Choose time when cycle starts.')
-        elif not self.df.loc[clock, 'Controllable']:
-            print('Load shifting not possible. Load already manipulated.')
-        else:
-            status_check = []
-            power_check = []
-            i_time = int(time / self.timestep)
-            for i in range(i_time):
-                if self.df.loc[clock + dt.timedelta(minutes=i), 'Status'] < 2:
-                    status_check.append(False)
-                else:
-                    status_check.append(True)
-                if self.df.loc[clock + dt.timedelta(minutes=i), 'P_in'] * factor <= self.base_load:
-                    power_check.append(False)
-                else:
-                    power_check.append(True)
-            if False in status_check:
-                print('Load capping not possible. Device in standby/base mode. Choose different parameters.')
-            elif False in power_check:
-                print('Load capping not possible. P_out < base load. Choose different factor.')
-            elif not self.df.loc[clock, 'Controllable']:
-                print('Load capping not possible. Load already manipulated.')
-            else:
-                drp = []
-                for j in range(i_time):
-                    delta_j = dt.timedelta(minutes=j)
-                    self.df.loc[clock + delta_j, 'P_out'] = self.df.loc[clock + delta_j, 'P_in'] * factor
-                    drp.append(self.df.loc[clock + delta_j, 'P_in'] - self.df.loc[clock + delta_j, 'P_out'])
-                for k in range(i_time):
-                    delta_k = dt.timedelta(minutes=k)
-                    self.df.loc[clock + time + step + delta_k, 'P_out'] = \
-                        self.df.loc[clock + time + step + delta_k, 'P_in'] + drp[k]
-                    drp.append(self.df.loc[clock + time + step + delta_k, 'P_in'] - self.df.loc[
-                        clock + time + step + delta_k, 'P_in'] + drp[k])
-                    self.df.loc[clock + time + step + delta_k, 'Controllable'] = False
-        self.update_status('P_out')
+        self.cap_at(self.axis.position(clock), self.axis.steps(step), self.axis.steps(time), factor)
         return self.df['P_out']
 
-
-'''
----------------------------------------------
-'''
-# create_profile()
-# start = self.df.index[j]
-# end = self.df.index[j+len(self.cycle.index)]
-# self.df.loc[start:end, 'Status'] = 3
-# self.df.loc[start:end, 'P_in'] = self.cycle.loc[self.cycle.index[0]:self.cycle.index[len(self.cycle.index)-1], 'P_cyc [kW]']
-# self.df.loc[start, 'Status'] = 2
-# k = j + len(self.cycle.index) + 1
+    @ins.measure('cap', ins.equipment)
+    def cap_at(self, position, offset, i_time, factor):
+        """
+        Function for load capping (positions, see cap())
+        position: int
+            cycle start
+        offset: int
+            time steps between capping and compensation
+        i_time: int
+            time steps during load is capped
+        factor: float
+            percentile for load capping
+        return: bool
+            Load capped
+        """
+        compensation = position + i_time + offset
+        p_in = self.arrays['P_in']
+        controllable = self.arrays['Controllable']
+        message = None
+        if self.arrays['Status'][position] != 2:
+            message = 'Load shifting not possible. Choose time when cycle starts.'
+        elif not controllable[position:position + i_time].all():
+            message = 'Load shifting not possible. Load already manipulated.'
+        elif compensation + i_time > len(p_in):
+            message = 'Load capping not possible. Compensation exceeds time horizon.'
+        elif not controllable[compensation:compensation + i_time].all():
+            message = 'Load capping not possible. Load already manipulated during compensation.'
+        elif np.any(self.arrays['Status'][position:position + i_time] < 2):
+            message = 'Load capping not possible. Device in standby/base mode. Choose different parameters.'
+        elif np.any(p_in[position:position + i_time] * factor <= self.base_load):
+            message = 'Load capping not possible. P_out < base load. Choose different factor.'
+        else:
+            self.record_p_out(position, i_time)
+            self.record_p_out(compensation, i_time)
+            p_out = self.arrays['P_out']
+            p_out[position:position + i_time] = p_in[position:position + i_time] * factor
+            drp = p_in[position:position + i_time] - p_out[position:position + i_time]
+            # Compensation on top of current P_out (e.g. base load of a shifted cycle)
+            p_out[compensation:compensation + i_time] += drp
+            controllable[compensation:compensation + i_time] = False
+            self.update_status('P_out', position, compensation + i_time)
+            ev.record(self.name, self.axis.clock(position), 'cap', compensation - position, i_time,
+                      float(drp.sum()) / self.axis.per_hour)
+            if ins.enabled:
+                ins.count(self.name, 'cap', 2 * i_time)
+        if message is not None:
+            ev.record(self.name, self.axis.clock(position), 'cap refused', compensation - position, i_time)
+            if ev.show(3):
+                print(message)
+        return message is None
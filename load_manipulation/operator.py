@@ -16,8 +16,12 @@ __author__ = "Paul Bohn"
 
 import numpy as np
 import datetime as dt
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
+import load_manipulation.charts as ch
+import load_manipulation.events as ev
+import load_manipulation.instrumentation as ins
+import load_manipulation.kernels as kn
+import load_manipulation.target_function as tf
+import load_manipulation.timeaxis as ta
 
 
 class Operator:
@@ -25,18 +29,33 @@ class Operator:
     Class to control and manipulate environment
     """
 
-    def __init__(self, env, target_func=None):
+    def __init__(self, env, target_func=None, renderer=None):
         """
         env: object (class Environment)
             Object contains all loads from class Equipment
-        target_func: pd.DataFrame
-            Target Function
+        target_func: pd.DataFrame or object (class TargetFunction)
+            Target Function; a TargetFunction is loaded and copied, a DataFrame is extended in place
+        renderer: object (class Renderer, default None)
+            Chart rendering (None: interactive charts)
         """
         self.env = env
+        if isinstance(target_func, tf.TargetFunction):
+            target_func = target_func.load().copy()
         self.target_func = target_func
+        # Positions of target function (internal time steps, timestamps only at the API boundary)
+        self.axis = ta.TimeAxis.from_index(target_func.index)
+        for load in env.variable_load:
+            if load.axis.step != self.axis.step:
+                raise ValueError('Time step of ' + load.name + ' differs from time step of target function.')
+        self.renderer = ch.Renderer() if renderer is None else renderer
+        # Prefix sums of column Curtailment [kW] for compensation search
+        self.curtailment_sum = None
+        # Runs of column Status (first position, position after the last one, status)
+        self.segments = None
         # Functions
         self.create_tf()
 
+    @ins.measure('create_tf')
     def create_tf(self):
         """
         Function to create required columns in target function
@@ -51,23 +70,36 @@ class Operator:
         tf['Ref. Curtailment [kW]'] = np.where(tf['Ref. Curtailment [kW]'] < 0, 0, tf['Ref. Curtailment [kW]'])
         tf['Curtailment [kW]'] = tf['Ref. Curtailment [kW]']
         tf['Ref. Load [kW]'] = self.env.load_ref['Reference Load']
-        tf['Load [kW]'] = self.env.load_df['Total']
+        tf['Load [kW]'] = self.env.total
         tf['Manipulated'] = False
         tf['Status'] = np.where(tf['PV [kW]'] < 0.1, 0, np.where(tf['Ref. Curtailment [kW]'] <= 0, 1, 2))
         self.target_func = tf
+        self.curtailment_sum = kn.cumulative_sum(tf['Curtailment [kW]'])
+        self.segments = kn.run_lengths(tf['Status'].to_numpy())
 
         return self.target_func
 
-    def total_load(self):
+    @ins.measure('total_load')
+    def total_load(self, optimizer=None, resolution=None):
         """
         Function to run load_manipulation() for all equipment
+        optimizer: object (class Optimizer, default None)
+            Global load manipulation of all equipment (None or no solution: greedy load_manipulation())
+        resolution: dt.timedelta (default None)
+            Coarse resolution of multi-resolution mode, e.g. 15 minutes: load_manipulation() runs only in the windows
+            found by coarse_windows() (None: whole horizon)
         TODO:
             - Add price and CO2 factor - depending on grid or diesel system (Blackout hours needed)
         """
         optimized_curtailment = []
         total = []
+        plan = None if optimizer is None else optimizer.solve()
         for i in range(len(self.env.variable_load)):
-            self.load_manipulation(i, False)
+            if plan is None:
+                windows = None if resolution is None else self.coarse_windows(i, resolution)
+                self.load_manipulation(i, False, windows=windows)
+            else:
+                self.apply_manipulation(i, plan[i])
             savings = self.calc_curtailment()
             ref_curtailment = savings[0]
             optimized_curtailment.append(savings[1])
@@ -75,45 +107,64 @@ class Operator:
                 total.append(ref_curtailment-optimized_curtailment[i])
             else:
                 total.append(optimized_curtailment[i-1]-optimized_curtailment[i])
-        print('\n' + 'Total Curtailment Reduction:')
+        if ev.show(1):
+            print('\n' + 'Total Curtailment Reduction:')
         self.calc_curtailment()
         self.create_line_chart()
         self.create_pie_chart(ref_curtailment, total)
+        self.renderer.wait()
 
-    def load_manipulation(self, index, x=True):
+    @ins.measure('load_manipulation', ins.variable_load(0))
+    def load_manipulation(self, index, x=True, start=0, stop=None, windows=None):
         """
         Function to manipulate loads.
 
         index: int
             index in list
-        clock: dt.datetime
-            time from operator to manipulate
+        x: bool (default True)
+            Print results and create line chart
+        start: int (default 0)
+            Position of first time step with manipulated cycle starts
+        stop: int (default None)
+            Position after last time step with manipulated cycle starts (None: end of target function)
+        windows: list (default None)
+            (start, stop) positions of windows with manipulated cycle starts, e.g. from coarse_windows() (None:
+            actionable segments from start to stop, see segment_windows())
         """
-        print('Manipulating: ' + self.env.variable_load[index].name)
+        if ev.show(2):
+            print('Manipulating: ' + self.env.variable_load[index].name)
         if self.env.variable_load[index].manipulation_type is None:
-            print('Fixed Load - load manipulation not possible.')
-            pass
+            if ev.show(2):
+                print('Fixed Load - load manipulation not possible.')
         else:
             load = self.env.variable_load[index]
-            for i in range(len(self.target_func.index)):
-                clock = self.target_func.index[i]
-                # Skip time steps with PV curtailment
-                if self.target_func.loc[clock, 'Status'] == 2:
-                    continue
-                else:
-                    # Skip manipulated time steps
-                    if load.df.loc[clock, 'Controllable']:
-                        if load.df.loc[load.df.index[i], 'Status'] == 2:
-                            # Check load manipulation_type/run functions
-                            if load.manipulation_type == 'Cap':
-                                self.sub_p_t(index, clock)
-                            elif load.manipulation_type == 'Shift':
-                                self.sub_t(index, clock)
-                            else:
-                                pass
-                        else:
-                            pass
-            self.env.summarize_load()
+            if windows is None:
+                windows = self.segment_windows(index, start, stop)
+            for start, stop in windows:
+                # Visit cycle starts of controllable time steps without PV curtailment only
+                load.status_changed = None
+                events = self.cycle_starts(load, start, stop)
+                k = 0
+                while k < len(events):
+                    i = events[k]
+                    k += 1
+                    # Check load manipulation_type/run functions
+                    if load.manipulation_type == 'Cap':
+                        self.sub_p_t(index, i)
+                    elif load.manipulation_type == 'Shift':
+                        self.sub_t(index, i)
+                    else:
+                        pass
+                    # Manipulation changed status: find cycle starts again in changed time steps
+                    if load.status_changed is not None:
+                        changed_start = max(load.status_changed[0], i + 1)
+                        changed_stop = min(load.status_changed[1], stop)
+                        load.status_changed = None
+                        if changed_start < changed_stop:
+                            events = events[k:]
+                            events = np.union1d(events[(events < changed_start) | (events >= changed_stop)],
+                                                self.cycle_starts(load, changed_start, changed_stop))
+                            k = 0
             self.env.update_load(index)
             self.update_target_func(index)
             if x is False:
@@ -122,58 +173,172 @@ class Operator:
                 self.calc_curtailment()
                 self.create_line_chart(index)
 
-    def sub_t(self, index, clock):
+    @ins.measure('apply_manipulation', ins.variable_load(0))
+    def apply_manipulation(self, index, manipulation):
+        """
+        Function to apply planned manipulations to a load (e.g. from Optimizer.solve()).
+
+        index: int
+            index in env.variable_load
+        manipulation: list
+            (manipulation_type, clock, step, duration) of every manipulated cycle start
+        """
+        load = self.env.variable_load[index]
+        if ev.show(2):
+            print('Manipulating: ' + load.name)
+        for manipulation_type, clock, step, duration in manipulation:
+            if manipulation_type == 'Cap':
+                load.cap(clock, step, duration, load.cap_factor)
+                if ev.show(2):
+                    print(str(clock) + ': ' + str(load.name) + ' capped to ' + str(load.cap_factor * 100) + '% for ' +
+                          str(duration) + ', compensated after ' + str(step) + '.')
+            elif manipulation_type == 'Shift':
+                load.shift(clock, step)
+                if ev.show(2):
+                    print(str(clock) + ': ' + str(load.name) + ' shifted to ' + str(clock + step) + '.')
+        self.env.update_load(index)
+        self.update_target_func(index)
+
+    @ins.measure('coarse_windows', ins.variable_load(0))
+    def coarse_windows(self, index, resolution=dt.timedelta(minutes=15)):
+        """
+        Function to find the windows of a load where curtailment and controllable cycle starts coexist (coarse pass
+        of multi-resolution mode). Cycle starts outside the windows have no curtailment within cycle and compensation
+        period, so load_manipulation() in the windows gives the result of the whole horizon.
+
+        index: int
+            index in env.variable_load
+        resolution: dt.timedelta (default 15 minutes)
+            Block length of coarse grid
+        return: list
+            (start, stop) positions of windows
+        """
+        load = self.env.variable_load[index]
+        size = len(self.target_func.index)
+        # Status refreshes of manipulations turn running time steps into cycle starts
+        starts = (load.arrays['Status'] >= 2) & load.arrays['Controllable'] & \
+            (self.target_func['Status'].to_numpy() != 2)
+        windows = kn.coarse_windows(starts, self.target_func['Curtailment [kW]'].to_numpy(),
+                                    max(self.axis.steps(resolution), 1), self.reach(load))
+        if ins.enabled:
+            ins.count(load.name, 'coarse_windows', size)
+        return windows
+
+    @ins.measure('segment_windows', ins.variable_load(0))
+    def segment_windows(self, index, start=0, stop=None):
+        """
+        Function to find the actionable windows of a load from runs of target function status and controllability:
+        segments without curtailment (cycle starts are visited there only) with curtailment within cycle and
+        compensation period of their last time step, intersected with the controllable runs of the load. Segments
+        are discarded from prefix sums of curtailment, so nights and days without curtailment cost one comparison.
+
+        index: int
+            index in env.variable_load
+        start: int (default 0)
+            First position
+        stop: int (default None)
+            Position after the last one (None: end of target function)
+        return: list
+            (start, stop) positions of windows
+        """
+        load = self.env.variable_load[index]
+        size = len(self.target_func.index)
+        stop = size if stop is None else stop
+        begin, end, status = self.segments
+        reachable = self.curtailment_sum[np.minimum(end + self.reach(load), size)] - self.curtailment_sum[begin]
+        keep = (status != 2) & (reachable > 0) & (end > start) & (begin < stop)
+        begin = np.maximum(begin[keep], start)
+        end = np.minimum(end[keep], stop)
+        run_begin, run_end, controllable = kn.run_lengths(load.arrays['Controllable'])
+        begin, end = kn.intersect_runs(begin, end, run_begin[controllable], run_end[controllable])
+        if ins.enabled:
+            ins.count(load.name, 'segment_windows', len(self.segments[0]) + len(run_begin))
+        return list(zip(begin.tolist(), end.tolist()))
+
+    def reach(self, load):
+        """
+        Function to get the time steps after a cycle start that can take part in its manipulation (cycle, cap and
+        compensation window, see cap_offsets() and shift_offsets())
+        load: object (class Equipment)
+            Variable load
+        """
+        return 2 * load.cycle_steps + max(load.period_steps, 1) + 1
+
+    @ins.measure('cycle_starts', ins.variable_load(0, 'load'))
+    def cycle_starts(self, load, start, stop):
+        """
+        Function to find positions of cycle starts of a controllable load outside PV curtailment
+
+        load: object (class Equipment)
+            Variable load
+        start: int
+            First position
+        stop: int
+            Position after the last one
+        """
+        event = (load.arrays['Status'][start:stop] == 2) & load.arrays['Controllable'][start:stop] & \
+            (self.target_func['Status'].to_numpy()[start:stop] != 2)
+        if ins.enabled:
+            ins.count(load.name, 'cycle_starts', stop - start)
+        return np.flatnonzero(event) + start
+
+    @ins.measure('sub_t', ins.variable_load(0))
+    def sub_t(self, index, position):
         """
         Sub function to manipulate time of load (run by load_manipulation())
 
         index: int
             passed from function load_manipulation()
-        clock: dt.datetime
+        position: int
             passed from function load_manipulation()
         """
         load = self.env.variable_load[index]
-        parameters = self.shift_comp_time(clock, dt.timedelta(minutes=len(load.cycle.index)), load.period, index)
-        comp_time = parameters[0]
-        if comp_time is None:
+        offset = self.shift_offsets(index, [position])[0]
+        if offset is None:
             pass
             # print('Load compensation not possible within period. No reduction of PV curtailment.')
-        elif not comp_time:
-            print('Load already at optimal time for curtailment reduction. Timestamp: ' + str(clock) + '.')
+        elif not offset:
+            clock = self.axis.clock(position)
+            ev.record(load.name, clock, 'optimal')
+            if ev.show(3):
+                print('Load already at optimal time for curtailment reduction. Timestamp: ' + str(clock) + '.')
         else:
             # Call function from load object (type: class Equipment)
-            self.env.variable_load[index].shift(clock, comp_time)
+            load.shift_at(position, offset)
             # Print Load Shifting parameters
-            print(str(clock) + ': ' + str(self.env.variable_load[index].name) + ' shifted to ' +
-                  str(clock + comp_time) + '.')
+            if ev.show(2):
+                print(str(self.axis.clock(position)) + ': ' + str(load.name) + ' shifted to ' +
+                      str(self.axis.clock(position + offset)) + '.')
 
-    def sub_p_t(self, index, clock):
+    @ins.measure('sub_p_t', ins.variable_load(0))
+    def sub_p_t(self, index, position):
         """
         Sub function to manipulate time and power of load (run by load_manipulation())
 
         index: int
             passed from function load_manipulation()
-        clock: dt.datetime
+        position: int
             passed from function load_manipulation()
         TODO:
             - Compensation directly after cycle --> e.g. AC needs to cool room if compensation later room will be to hot
             - Maybe new function for compensation
         """
         load = self.env.variable_load[index]
-        parameters = self.cap_comp_time(clock, dt.timedelta(minutes=len(load.cycle.index)), index, load.cap_factor)
-        comp_time = parameters[0]
-        duration = parameters[1]
-        if comp_time is None:
+        offset, duration = self.cap_offsets(index, position, load.cap_factor)
+        if offset is None:
             pass
             # print(str(clock) + ': Load compensation not possible within period. No reduction of PV curtailment.')
-        elif not comp_time:
+        elif offset is False:
             pass
             # print(str(clock) + ': Load already at optimal time for curtailment reduction.')
         else:
             # Call function from load object (type: class Equipment)
-            self.env.variable_load[index].cap(clock, comp_time, duration, load.cap_factor)
+            load.cap_at(position, offset, duration, load.cap_factor)
             # Print Load Capping parameters
-            print(str(clock) + ': ' + str(self.env.variable_load[index].name) + ' capped to ' + str(
-                load.cap_factor * 100) + '% for ' + str(comp_time) + ' min.')
+            if ev.show(2):
+                print(str(self.axis.clock(position)) + ': ' + str(load.name) + ' capped to ' + str(
+                    load.cap_factor * 100) + '% for ' + str(self.axis.duration(duration)) + ', compensated after ' +
+                    str(self.axis.duration(offset)) + '.')
 
     def shift_comp_time(self, clock, duration, period, index):
         """
@@ -184,141 +349,215 @@ class Operator:
         clock: dt.datetime
             Manipulation start
         duration: dt.timedelta
-            Manipulation duration (len(cycle.index))
+            Manipulation duration (None: cycle of load)
         period: dt.timedelta
-            Maximum time span for load compensation
+            Maximum time span for load compensation (None: period of load)
+        """
+        comp_time = self.shift_comp_times([clock], duration, period, index)[0]
+        return comp_time, self.env.variable_load[index].cycle_duration if duration is None else duration
+
+    def shift_comp_times(self, clocks, duration, period, index):
+        """
+        Function to find optimal compensation times for several cycle starts of one load in one call (timestamps,
+        see shift_offsets()).
+
+        index: int
+            index in env.variable_load
+        clocks: list
+            Manipulation starts (dt.datetime)
+        duration: dt.timedelta
+            Manipulation duration (None: cycle of load)
+        period: dt.timedelta
+            Maximum time span for load compensation (None: period of load)
+        return: list
+            Compensation time for every start (dt.timedelta, False: already optimal, None: no compensation possible)
+        """
+        offsets = self.shift_offsets(index, self.axis.positions(clocks),
+                                     None if duration is None else self.axis.steps(duration),
+                                     None if period is None else self.axis.steps(period))
+        return [offset if offset is None or offset is False else self.axis.duration(offset) for offset in offsets]
+
+    @ins.measure('shift_offsets', ins.variable_load(0))
+    def shift_offsets(self, index, positions, duration=None, period=None):
+        """
+        Function to find optimal compensation offsets for several cycle starts of one load in one call.
+        Every start is scored against the current state of target function and load.
+
+        index: int
+            index in env.variable_load
+        positions: list
+            Manipulation starts (int)
+        duration: int (default None)
+            Manipulation duration [time steps] (None: cycle of load)
+        period: int (default None)
+            Maximum time span for load compensation [time steps] (None: period of load)
+        return: list
+            Compensation offset for every start (int, False: already optimal, None: no compensation possible)
         """
-        tf = self.target_func
         load = self.env.variable_load[index]
-        c_pv = []
-        c_load = []
-        c_curtailment = []
-        i_period = int(period / dt.timedelta(minutes=1))
-        for i in range(len(load.cycle.index)):
-            t = clock + dt.timedelta(minutes=i)
-            c_pv.append(tf.loc[t, 'PV [kW]']/60)
-            c_load.append((self.env.load_df.loc[t, 'Total'] - load.df.loc[t, 'P_out'])/60)
-            if c_pv[-1] - c_load[-1] < 0:
-                c_curtailment.append(0)
+        i_duration = load.cycle_steps if duration is None else duration
+        i_period = load.period_steps if period is None else period
+        position = np.asarray(positions, dtype=np.int64)
+        # Current curtailment and future curtailment for every compensation offset (window includes its last time
+        # step)
+        c_curtailment, f_curtailment = kn.shift_scores(self.target_func['PV [kW]'].to_numpy(), self.env.total,
+                                                       load.arrays['P_out'], self.curtailment_sum, position,
+                                                       i_duration, i_period, self.axis.per_hour)
+        if ins.enabled:
+            ins.count(load.name, 'shift_offsets', len(position) * (i_duration + i_period))
+        offsets = []
+        for i in range(len(position)):
+            if np.all(f_curtailment[i] <= 0):
+                offsets.append(None)
+            elif c_curtailment[i] >= f_curtailment[i].max():
+                offsets.append(False)
             else:
-                c_curtailment.append(c_pv[-1] - c_load[-1])
-        f_curtailment = []
-        for i in range(i_period):
-            """
-            Find ideal time for load compensation
-            """
-            start = clock + dt.timedelta(minutes=i)
-            stop = clock + duration + dt.timedelta(minutes=i)
-            f_curtailment.append(tf.loc[start:stop, 'Curtailment [kW]'].sum()/60)
-        if all(v <= 0 for v in f_curtailment):
-            comp_time = None
-        elif sum(c_curtailment) >= max(f_curtailment):
-            comp_time = False
-        else:
-            comp_time = dt.timedelta(minutes=f_curtailment.index(max(f_curtailment)))
-        return comp_time, duration
+                offsets.append(int(f_curtailment[i].argmax()))
+        return offsets
 
     def cap_comp_time(self, clock, duration, index, factor):
         """
-        Function to find optimal compensation time for load manipulation based on maximum reduction of PV Curtailment.
+        Function to find optimal compensation time and cap duration for load capping (timestamps, see cap_offsets())
 
         index: int
             index in env.variable_load
         clock: dt.datetime
             Manipulation start
         duration: dt.timedelta
-            Manipulation duration (len(cycle.index))
-        period: dt.timedelta
-            Maximum time span for load compensation
+            Maximum manipulation duration (None: cycle of load)
+        factor: float
+            percentile for load capping
+        return: (dt.timedelta, dt.timedelta)
+            Compensation time (False: no reduction of curtailment, None: no compensation possible) and cap duration
+        """
+        offset, steps = self.cap_offsets(index, self.axis.position(clock), factor,
+                                         None if duration is None else self.axis.steps(duration))
+        if offset is None or offset is False:
+            return offset, self.env.variable_load[index].cycle_duration if duration is None else duration
+        return self.axis.duration(offset), self.axis.duration(steps)
+
+    @ins.measure('cap_offsets', ins.variable_load(0))
+    def cap_offsets(self, index, position, factor, duration=None):
+        """
+        Function to find optimal compensation offset and cap duration for load capping based on maximum reduction of
+        PV Curtailment. All cap durations up to duration and compensation offsets within period are evaluated in one
+        array pass: the energy deficit of a cap (cycle_sum * (1 - factor) for the whole cycle) is compensated in a
+        window of the same duration, which reduces curtailment by at most the curtailment of that window. Capping
+        during curtailment increases curtailment by the deficit. Compensation windows are controllable and do not
+        touch other cycles, so later manipulations of those cycles keep the compensated energy.
+
+        index: int
+            index in env.variable_load
+        position: int
+            Manipulation start
+        factor: float
+            percentile for load capping
+        duration: int (default None)
+            Maximum manipulation duration [time steps] (None: cycle of load)
+        return: (int, int)
+            Compensation offset (False: no reduction of curtailment, None: no compensation possible) and cap duration
+            [time steps]
         """
         tf = self.target_func
         load = self.env.variable_load[index]
-        # Calculate current curtailment
-        c_pv = []
-        c_load = []
-        c_curtailment = []
-        for i in range(len(load.cycle.index)):
-            t = clock + dt.timedelta(minutes=i)
-            c_pv.append(tf.loc[t, 'PV [kW]']/60)
-            c_load.append((self.env.load_df.loc[t, 'Total'] - load.df.loc[t, 'P_out'])/60)
-            if c_pv[-1] - c_load[-1] < 0:
-                c_curtailment.append(0.0)
-            else:
-                c_curtailment.append(c_pv[-1] - c_load[-1])
-        # Calculate future curtailment
-        f_curtailment = []
-        cycle_sum = sum(load.cycle['P_cyc [kW]'])
-        cycle_average = load.cycle['P_cyc [kW]'].mean()
-        delta = cycle_sum * (1-factor)
-        # time = math.ceil(delta / cycle_average)
+        if duration is None:
+            # Cycle starts carry the cycle in P_in: caps end at the first time step of the cycle not feasible
+            duration = load.cap_steps if factor == load.cap_factor else load.cycle_steps
+            if duration == 0:
+                return None, duration
+        durations, f_curtailment, reduction = kn.cap_scores(
+            load.arrays['P_in'], load.arrays['Status'], load.arrays['Controllable'], tf['Status'].to_numpy(),
+            self.curtailment_sum, position, load.cycle_steps, duration, max(load.period_steps, 1), factor,
+            load.base_load, self.axis.per_hour)
+        if ins.enabled:
+            ins.count(load.name, 'cap_offsets', reduction.size)
+        if len(durations) == 0:
+            return None, duration
         # Compare current and future curtailment
-        if all(v <= 0 for v in f_curtailment):
-            comp_time = None
-        elif sum(c_curtailment) >= max(f_curtailment):
-            comp_time = False
-        else:
-            comp_time = dt.timedelta(minutes=f_curtailment.index(max(f_curtailment)))
-        return comp_time, duration
+        if np.all(f_curtailment <= 0):
+            return None, duration
+        offset, i = np.unravel_index(np.argmax(reduction), reduction.shape)
+        if reduction[offset, i] <= 0:
+            return False, duration
+        return int(offset), int(durations[i])
 
+    @ins.measure('update_target_func', ins.variable_load(0))
     def update_target_func(self, index):
         """
         Function to update Curtailment in target function
         """
         tf = self.target_func
-        load = self.env.variable_load[index].df
-        tf['Load [kW]'] = self.env.load_df['Total']
-        tf['Curtailment [kW]'] = np.where(tf['Curtailment [kW]'] - load['P_out'] + load['P_in'] < 0, 0,
-                                          tf['Curtailment [kW]'] - load['P_out'] + load['P_in'])
-        tf['Curtailment [kW]'] = np.where(tf['Status'] < 2, 0, tf['Curtailment [kW]'])
+        load = self.env.variable_load[index].arrays
+        curtailment = tf['Curtailment [kW]'].to_numpy() - load['P_out'] + load['P_in']
+        tf['Load [kW]'] = self.env.total
+        tf['Curtailment [kW]'] = np.where((curtailment < 0) | (tf['Status'].to_numpy() < 2), 0, curtailment)
+        self.curtailment_sum = kn.cumulative_sum(tf['Curtailment [kW]'])
+        if ins.enabled:
+            ins.count(self.env.variable_load[index].name, 'update_target_func', len(curtailment))
 
         return self.target_func, self.env.load_df
 
+    @ins.measure('carry_curtailment')
+    def carry_curtailment(self):
+        """
+        Function to remove curtailment absorbed by manipulations made before the operator was created (e.g. carried
+        into the overlap of a chunk by the previous chunk, see streaming), load by load as in update_target_func().
+        Only manipulated time steps (P_out != P_in) are updated.
+        """
+        tf = self.target_func
+        curtailment = tf['Curtailment [kW]'].to_numpy().copy()
+        status = tf['Status'].to_numpy()
+        for load in self.env.variable_load:
+            changed = np.flatnonzero(load.arrays['P_out'] != load.arrays['P_in'])
+            value = curtailment[changed] - load.arrays['P_out'][changed] + load.arrays['P_in'][changed]
+            curtailment[changed] = np.where((value < 0) | (status[changed] < 2), 0, value)
+        tf['Curtailment [kW]'] = curtailment
+        self.curtailment_sum = kn.cumulative_sum(tf['Curtailment [kW]'])
+
+    @ins.measure('calc_curtailment')
     def calc_curtailment(self):
         """
         Function to calculate curtailment reduction
         """
-        ref = self.target_func['Ref. Curtailment [kW]'].sum() / 60
-        opt = self.target_func['Curtailment [kW]'].sum() / 60
-        print('Reference Curtailment: ' + str(round(ref, 2)) + ' kWh')
-        print('Optimized Curtailment: ' + str(round(opt, 2)) + ' kWh')
-        print('Curtailment Reduction: ' + str(round(ref - opt, 2)) + ' kWh')
-        print('Relative Curtailment Reduction: ' + str(round((ref-opt)/ref*100, 2)) + '%')
+        ref = self.target_func['Ref. Curtailment [kW]'].sum() / self.axis.per_hour
+        opt = self.target_func['Curtailment [kW]'].sum() / self.axis.per_hour
+        ev.record('total', None, 'curtailment', energy=ref - opt)
+        if ev.show(1):
+            print('Reference Curtailment: ' + str(round(ref, 2)) + ' kWh')
+            print('Optimized Curtailment: ' + str(round(opt, 2)) + ' kWh')
+            print('Curtailment Reduction: ' + str(round(ref - opt, 2)) + ' kWh')
+            print('Relative Curtailment Reduction: ' + str(round((ref-opt)/ref*100, 2)) + '%')
 
         return ref, opt
 
+    @ins.measure('create_line_chart', ins.variable_load(0))
     def create_line_chart(self, index=None):
         """
         Function to compare and plot results (load & curtailment)
         """
+        if self.renderer.mode == 'off':
+            return
         tf = self.target_func
-        plt.figure()
         source = ['PV [kW]', 'Ref. Curtailment [kW]', 'Curtailment [kW]', 'Ref. Load [kW]', 'Load [kW]']
         color = ['orangered', 'darkblue', 'cornflowerblue', 'darkgreen', 'lightgreen']
-        label = ['PV Production', 'Reference Curtailment', 'Reference Load', 'Optimized Curtailment',
+        label = ['PV Production', 'Reference Curtailment', 'Optimized Curtailment', 'Reference Load',
                  'Optimized Load']
+        series = []
         for i in range(len(source)):
-            plt.plot(tf.index.to_pydatetime(), tf[source[i]], color[i], linewidth=0.8, label=label[i])
+            series.append((tf[source[i]].to_numpy(), color[i], label[i]))
         if index is None:
-            pass
+            name = 'total'
         else:
-            load_df = self.env.variable_load[index].df
+            load = self.env.variable_load[index]
+            name = load.name.replace('/', '_')
             load_source = ['P_in', 'P_out']
             load_color = ['black', 'grey']
             load_label = [': Reference', ': Manipulated']
             for i in range(len(load_source)):
-                plt.plot(tf.index.to_pydatetime(), load_df[load_source[i]], load_color[i], linewidth=0.8,
-                         label=self.env.variable_load[index].name + load_label[i])
-        # Format axis
-        plt.gcf().autofmt_xdate()
-        x_axis = mdates.DateFormatter('%H:%M')
-        plt.gca().xaxis.set_major_formatter(x_axis)
-        plt.title('Hospital Energy Design Utility')
-        plt.ylabel('P [kW]')
-        plt.xlabel('Time [hh:mm]')
-        plt.tight_layout()
-        plt.legend(loc=2, prop={'size': 6})
-        plt.show()
+                series.append((load.arrays[load_source[i]], load_color[i], load.name + load_label[i]))
+        self.renderer.line_chart('line_chart_' + name, tf.index.to_numpy(), series)
 
+    @ins.measure('create_pie_chart')
     def create_pie_chart(self, ref_curtailment, reduction):
         """
         Function to create pie chart to compare curtailment reduction
@@ -334,11 +573,12 @@ class Operator:
             labels.append(self.env.variable_load[i].name)
         labels.append('Optimized Curtailment')
         values.append(ref_curtailment - sum(values))
-        # Create Pie Chart
-        fig1, ax1 = plt.subplots()
-        ax1.pie(values, labels=labels)
-        ax1.axis('equal')
-        plt.show()
+        # Without reference curtailment (e.g. overcast horizon) the pie has no wedges
+        if sum(values) <= 0:
+            if ev.show(3):
+                print('No reference curtailment. Pie chart not created.')
+            return
+        self.renderer.pie_chart('pie_chart', values, labels)
 
     def calc_savings(self, reference, optimized, blackout):
         """
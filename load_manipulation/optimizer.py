@@ -0,0 +1,272 @@
+"""
+Optimizer module of HEyDU schedules the load manipulation of all variable loads in one mixed-integer linear program
+
+Every cycle start outside PV curtailment is a candidate for load shifting (Shift, Cap/Shift) and load capping (Cap,
+Cap/Shift) with the compensation offsets within period that meet the most curtailment. Binary variables select the
+candidates:
+    - at most one candidate per cycle start
+    - compensation windows of a load do not overlap each other or other cycles of that load
+    - a cycle start directly after another cycle is not manipulated if the status refresh of another manipulation
+      covers it (it would become running)
+so the change of P_out of every candidate is known in advance. The program minimizes the remaining curtailment:
+
+    min sum(c_t) / 60   with   c_t + sum(delta_jt * x_j) >= curtailment_t,   c_t >= 0,   x_j in {0, 1}
+
+It is solved by HiGHS (scipy.optimize.milp, optional dependency) within a time limit. Operator.total_load() falls back
+to the greedy load manipulation if scipy is not installed or the solver found no solution.
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import numpy as np
+import load_manipulation.events as ev
+import load_manipulation.kernels as kn
+
+
+class Optimizer:
+    """
+    Class to schedule the load manipulation of all variable loads of an operator
+    """
+
+    def __init__(self, operator, time_limit=60, offsets=8, stride=1, gap=1e-3):
+        """
+        operator: object (class Operator)
+            Operator of an environment without load manipulation
+        time_limit: float (default 60)
+            Time limit of solver [s]
+        offsets: int (default 8)
+            Compensation offsets per cycle start and manipulation type (offsets with most curtailment)
+        stride: int (default 1)
+            Time steps between compensation offsets
+        gap: float (default 1e-3)
+            Relative MIP gap of solver
+        """
+        self.operator = operator
+        self.time_limit = time_limit
+        self.offsets = offsets
+        self.stride = max(int(stride), 1)
+        self.gap = gap
+        self.result = None
+
+    def solve(self):
+        """
+        Function to solve the load manipulation of all variable loads
+        return: list
+            Manipulations of every variable load (list of tuples (manipulation_type, clock, step, duration)) or None
+            (no solution: scipy not installed, infeasible or time limit without solution)
+        """
+        try:
+            # scipy is only needed (and only imported) for the optimizer
+            from scipy import optimize, sparse
+        except ImportError:
+            ev.record('optimizer', None, 'fallback')
+            if ev.show(1):
+                print('Optimizer: scipy not installed. Greedy load manipulation.')
+            return None
+        parts = []
+        for i in range(len(self.operator.env.variable_load)):
+            parts += self.shift_candidates(i) + self.cap_candidates(i)
+        plan = [[] for i in range(len(self.operator.env.variable_load))]
+        size = sum(len(part['start']) for part in parts)
+        if size == 0:
+            return plan
+        table = {key: np.concatenate([part[key] for part in parts])
+                 for key in ('index', 'type', 'start', 'step', 'duration', 'begin', 'end', 'adjacent')}
+        # Curtailment rows: c_t + sum(delta_jt * x_j) >= curtailment_t
+        first = np.cumsum([0] + [len(part['start']) for part in parts])
+        column = np.concatenate([np.repeat(np.arange(first[k], first[k + 1]), parts[k]['position'].shape[1])
+                                 for k in range(len(parts))])
+        position = np.concatenate([part['position'].ravel() for part in parts])
+        delta = np.concatenate([part['delta'].ravel() for part in parts])
+        tf = self.operator.target_func
+        keep = (delta != 0) & (tf['Status'].to_numpy()[position] == 2)
+        steps, row = np.unique(position[keep], return_inverse=True)
+        width = size + len(steps)
+        a_curtailment = sparse.coo_array((np.concatenate((delta[keep], np.ones(len(steps)))),
+                                          (np.concatenate((row, np.arange(len(steps)))),
+                                           np.concatenate((column[keep], size + np.arange(len(steps)))))),
+                                         shape=(len(steps), width)).tocsr()
+        # Conflict rows: one candidate per cycle start, compensation windows of a load do not overlap
+        a_conflict = self.conflicts(table, width, sparse)
+        cost = np.concatenate((np.zeros(size), np.full(len(steps), 1 / self.operator.axis.per_hour)))
+        integrality = np.concatenate((np.ones(size), np.zeros(len(steps))))
+        bounds = optimize.Bounds(0, np.concatenate((np.ones(size), np.full(len(steps), np.inf))))
+        constraints = [optimize.LinearConstraint(a_curtailment, tf['Curtailment [kW]'].to_numpy()[steps], np.inf),
+                       optimize.LinearConstraint(a_conflict, -np.inf, 1)]
+        self.result = optimize.milp(cost, integrality=integrality, bounds=bounds, constraints=constraints,
+                                    options={'time_limit': self.time_limit, 'mip_rel_gap': self.gap})
+        if self.result.x is None:
+            ev.record('optimizer', None, 'fallback')
+            if ev.show(1):
+                print('Optimizer: ' + self.result.message + ' Greedy load manipulation.')
+            return None
+        selected = np.flatnonzero(self.result.x[:size] > 0.5)
+        selected = selected[np.lexsort((table['start'][selected], table['index'][selected]))]
+        types = ['Shift', 'Cap']
+        for j in selected:
+            plan[table['index'][j]].append((types[table['type'][j]], self.operator.axis.clock(table['start'][j]),
+                                            self.operator.axis.duration(table['step'][j]),
+                                            self.operator.axis.duration(table['duration'][j])))
+        return plan
+
+    def conflicts(self, table, width, sparse):
+        """
+        Function to create the conflict matrix of all candidates (every row allows one candidate)
+        table: dict
+            Candidate arrays
+        width: int
+            Number of variables
+        sparse: module
+            scipy.sparse
+        """
+        size = len(table['start'])
+        # One candidate per cycle start
+        key = table['index'] * (int(table['end'].max()) + 1) + table['start']
+        row = np.unique(key, return_inverse=True)[1]
+        rows = [row]
+        columns = [np.arange(size)]
+        shift = row.max() + 1
+        # Compensation windows overlap if one of them contains the first time step of the other
+        for index in np.unique(table['index']):
+            j = np.flatnonzero(table['index'] == index)
+            first = np.unique(table['begin'][j])
+            low = np.searchsorted(first, table['begin'][j])
+            count = np.searchsorted(first, table['end'][j]) - low
+            offset = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+            rows.append(np.repeat(low, count) + offset + shift)
+            columns.append(np.repeat(j, count))
+            shift += len(first)
+            # Status is refreshed from start to end of a manipulation: a cycle start directly after another cycle
+            # becomes running (status 3), unless the previous cycle is shifted away
+            order = j[np.argsort(table['start'][j], kind='stable')]
+            adjacent = np.unique(table['start'][j][table['adjacent'][j]])
+            low = np.searchsorted(adjacent, table['start'][j], side='right')
+            count = np.searchsorted(adjacent, table['end'][j], side='right') - low
+            pair = np.repeat(j, count)
+            covered = adjacent[np.repeat(low, count) + np.arange(count.sum()) - np.repeat(np.cumsum(count) - count,
+                                                                                         count)]
+            keep = (table['type'][pair] != 0) | (table['start'][pair] + table['duration'][pair] != covered)
+            pair = pair[keep]
+            covered = covered[keep]
+            first = np.searchsorted(table['start'][order], covered)
+            count = np.searchsorted(table['start'][order], covered, side='right') - first
+            rows.append(np.arange(len(pair)) + shift)
+            columns.append(pair)
+            rows.append(np.repeat(np.arange(len(pair)), count) + shift)
+            columns.append(order[np.repeat(first, count) + np.arange(count.sum()) -
+                                 np.repeat(np.cumsum(count) - count, count)])
+            shift += len(pair)
+        rows = np.concatenate(rows)
+        return sparse.coo_array((np.ones(len(rows)), (rows, np.concatenate(columns))), shape=(shift, width)).tocsr()
+
+    def compensation_offsets(self, load, starts, first, length, offset):
+        """
+        Function to select the compensation offsets with most curtailment of every cycle start
+        load: object (class Equipment)
+            Variable load
+        starts: np.ndarray
+            Cycle starts
+        first: np.ndarray
+            First time step of compensation window with offset 0 of every cycle start
+        length: np.ndarray
+            Length of compensation window of every cycle start
+        offset: np.ndarray
+            Compensation offsets
+        return: (np.ndarray, np.ndarray)
+            Cycle start (index in starts) and compensation offset of every candidate
+        """
+        status = load.arrays['Status']
+        size = len(status)
+        begin = first[:, None] + offset
+        end = begin + length[:, None]
+        valid = end <= size
+        begin = np.minimum(begin, size)
+        end = np.minimum(end, size)
+        # Time steps of other cycles in window and the time step after it (a cycle start directly after the window
+        # would continue the compensation): all cycle time steps minus time steps of own cycle
+        after = np.minimum(end + 1, size)
+        cycle = kn.cumulative_sum(status >= 2)
+        own = np.maximum(np.minimum(after, starts[:, None] + load.cycle_steps) - np.maximum(begin, starts[:, None]),
+                         0)
+        valid &= cycle[after] - cycle[begin] - own == 0
+        curtailment = self.operator.curtailment_sum
+        score = np.where(valid, curtailment[end] - curtailment[begin], 0)
+        best = np.argsort(-score, axis=1, kind='stable')[:, :self.offsets]
+        row = np.repeat(np.arange(len(starts)), best.shape[1])
+        column = best.ravel()
+        keep = score[row, column] > 0
+        return row[keep], offset[column[keep]]
+
+    def candidate(self, load, index, kind, start, step, duration, begin, end, position, delta):
+        """
+        Function to create the arrays of candidates of one variable load and manipulation type
+        """
+        # Cycle start directly after another cycle
+        adjacent = (start > 0) & (load.arrays['Status'][np.maximum(start - 1, 0)] >= 2)
+        return {'index': np.full(len(start), index), 'type': np.full(len(start), kind), 'start': start, 'step': step,
+                'duration': duration, 'begin': begin, 'end': end, 'adjacent': adjacent, 'position': position,
+                'delta': delta}
+
+    def shift_candidates(self, index):
+        """
+        Function to create load shifting candidates (cycle shifted by step) of a variable load
+        index: int
+            index in env.variable_load
+        """
+        load = self.operator.env.variable_load[index]
+        if load.manipulation_type not in ('Shift', 'Cap/Shift'):
+            return []
+        size = len(load.arrays['Status'])
+        length = load.cycle_steps
+        starts = self.operator.cycle_starts(load, 0, size)
+        row, step = self.compensation_offsets(load, starts, starts, np.full(len(starts), length),
+                                              np.arange(1, load.period_steps, self.stride))
+        start = starts[row]
+        source = start[:, None] + np.arange(length)
+        target = source + step[:, None]
+        p_in = load.arrays['P_in']
+        p_out = load.arrays['P_out']
+        # Time steps of source within target are overwritten by target
+        position = np.concatenate((source, target), axis=1)
+        delta = np.concatenate((np.where(source < target[:, :1], load.base_load - p_out[source], 0),
+                                p_in[source] - p_out[target]), axis=1)
+        return [self.candidate(load, index, 0, start, step, np.full(len(start), length), start + step,
+                               start + step + length, position, delta)]
+
+    def cap_candidates(self, index):
+        """
+        Function to create load capping candidates (longest cap of cycle start, compensation after step) of a
+        variable load
+        index: int
+            index in env.variable_load
+        """
+        load = self.operator.env.variable_load[index]
+        if load.manipulation_type not in ('Cap', 'Cap/Shift'):
+            return []
+        status = load.arrays['Status']
+        p_in = load.arrays['P_in']
+        p_out = load.arrays['P_out']
+        size = len(status)
+        length = load.cycle_steps
+        starts = self.operator.cycle_starts(load, 0, size)
+        # Longest duration of cycle start with capped power above base load (cycle starts carry the cycle in P_in)
+        window = starts[:, None] + np.arange(load.cap_steps)
+        duration = np.cumprod(status[window] >= 2, axis=1).sum(axis=1)
+        starts = starts[duration > 0]
+        duration = duration[duration > 0]
+        row, step = self.compensation_offsets(load, starts, starts + duration, duration,
+                                              np.arange(0, max(load.period_steps, 1), self.stride))
+        start = starts[row]
+        duration = duration[row]
+        inside = np.arange(length) < duration[:, None]
+        source = start[:, None] + np.arange(length)
+        compensation = np.minimum(source + duration[:, None] + step[:, None], size - 1)
+        drp = p_in[source] * (1 - load.cap_factor)
+        position = np.concatenate((source, compensation), axis=1)
+        delta = np.concatenate((np.where(inside, p_in[source] * load.cap_factor - p_out[source], 0),
+                                np.where(inside, p_in[compensation] + drp - p_out[compensation], 0)), axis=1)
+        return [self.candidate(load, index, 1, start, step, duration, start + duration + step,
+                               start + 2 * duration + step, position, delta)]
@@ -0,0 +1,124 @@
+"""
+Scenario module of HEyDU runs variants of equipment parameters on a process pool
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import contextlib
+import io
+import itertools
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import load_manipulation.environment as env
+import load_manipulation.models as md
+import load_manipulation.operator as op
+
+# Read-only input of worker processes (equipment parameters, target function), set by share()
+shared = {}
+
+
+def share(equipment, target_function, blackout=False):
+    """
+    Function to set read-only input of scenarios in this process
+    equipment: list
+        Keyword arguments of class Equipment for every device (dict)
+    target_function: pd.DataFrame
+        Target Function
+    blackout: bool (default False)
+        Savings based on diesel system (True) or grid (False)
+    """
+    shared['equipment'] = equipment
+    shared['target_function'] = target_function
+    shared['blackout'] = blackout
+
+
+def create_grid(devices=None, **parameters):
+    """
+    Function to create a grid of parameter overrides (cartesian product of parameter values)
+    devices: list (default None)
+        Names of equipment devices to override (None: all devices)
+    parameters: list
+        Values per parameter of class Equipment, e.g. cap_factor=[0.6, 0.8], period=[dt.timedelta(minutes=30)]
+    return: list
+        Scenarios as dict {device name (None: all devices): {parameter: value}}
+    """
+    names = list(parameters)
+    grid = []
+    for values in itertools.product(*[parameters[name] for name in names]):
+        override = dict(zip(names, values))
+        if devices is None:
+            grid.append({None: override})
+        else:
+            grid.append({device: override for device in devices})
+    return grid
+
+
+def run_scenario(scenario):
+    """
+    Function to run load manipulation for all equipment with overridden parameters (runs in worker process)
+    scenario: dict
+        {device name (None: all devices): {parameter: value}}
+    """
+    equipment = []
+    for parameters in shared['equipment']:
+        parameters = dict(parameters)
+        parameters.update(scenario.get(None, {}))
+        parameters.update(scenario.get(parameters['name'], {}))
+        equipment.append(md.Equipment(**parameters))
+    with contextlib.redirect_stdout(io.StringIO()):
+        operator = op.Operator(env.Environment(equipment), shared['target_function'].copy())
+        for i in range(len(operator.env.variable_load)):
+            operator.load_manipulation(i, False)
+        ref_curtailment, opt_curtailment = operator.calc_curtailment()
+    co2_savings, cost_savings = operator.calc_savings(ref_curtailment, opt_curtailment, shared['blackout'])
+    return ref_curtailment, opt_curtailment, co2_savings, cost_savings
+
+
+def run_scenarios(equipment, target_function, grid, workers=None, blackout=False):
+    """
+    Function to run independent Environment/Operator pipelines for every scenario of a grid in parallel.
+    Equipment parameters and target function are shared with the workers once (fork: without copy).
+
+    equipment: list
+        Keyword arguments of class Equipment for every device (dict)
+    target_function: pd.DataFrame
+        Target Function
+    grid: list
+        Scenarios (see create_grid())
+    workers: int (default None)
+        Number of worker processes (None: number of CPUs, 1: run in this process)
+    blackout: bool (default False)
+        Savings based on diesel system (True) or grid (False)
+    return: pd.DataFrame
+        One row per scenario with overrides, curtailment and savings
+    """
+    if workers == 1:
+        share(equipment, target_function, blackout)
+        results = [run_scenario(scenario) for scenario in grid]
+    else:
+        if 'fork' in mp.get_all_start_methods():
+            # Workers inherit the shared input of this process
+            share(equipment, target_function, blackout)
+            executor = ProcessPoolExecutor(workers, mp_context=mp.get_context('fork'))
+        else:
+            executor = ProcessPoolExecutor(workers, initializer=share,
+                                           initargs=(equipment, target_function, blackout))
+        with executor:
+            results = list(executor.map(run_scenario, grid))
+    rows = []
+    for i in range(len(grid)):
+        row = {'Scenario': i}
+        for device, override in grid[i].items():
+            for parameter, value in override.items():
+                row[parameter if device is None else device + ': ' + parameter] = value
+        row['Ref. Curtailment [kWh]'] = results[i][0]
+        row['Curtailment [kWh]'] = results[i][1]
+        row['Curtailment Reduction [kWh]'] = results[i][0] - results[i][1]
+        row['CO2 Savings [kg]'] = results[i][2]
+        row['Cost Savings [€]'] = results[i][3]
+        rows.append(row)
+    return pd.DataFrame(rows).set_index('Scenario')
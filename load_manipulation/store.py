@@ -0,0 +1,75 @@
+"""
+Store module of HEyDU keeps the loads of all equipment in shared arrays
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import numpy as np
+
+
+class LoadStore:
+    """
+    Class to store one contiguous array (devices x time steps) per quantity
+    """
+
+    def __init__(self, load, dtype=np.float64, tolerance=1e-6):
+        """
+        load: list
+            contains all loads (class Equipment); row i of every array belongs to load[i]
+        dtype: np.dtype (default np.float64)
+            data type of power arrays (e.g. np.float32: half the memory of power arrays)
+        tolerance: float (default 1e-6)
+            Maximum relative error of powers and energies in dtype (checked for dtypes other than np.float64)
+        """
+        self.index = load[0].df.index if load else None
+        self.name = [load[i].name for i in range(len(load))]
+        shape = (len(load), len(self.index) if load else 0)
+        # Arrays
+        self.p_ref = np.zeros(shape, dtype=dtype)
+        self.p_in = np.zeros(shape, dtype=dtype)
+        self.p_out = np.zeros(shape, dtype=dtype)
+        self.status = np.zeros(shape, dtype=np.int8)
+        self.controllable = np.ones(shape, dtype=bool)
+        # Functions
+        if np.dtype(dtype) != np.float64:
+            self.check_precision(load, dtype, tolerance)
+        for i in range(len(load)):
+            load[i].attach(self, i)
+
+    @staticmethod
+    def check_precision(load, dtype, tolerance):
+        """
+        Function to check if the powers of all loads can be stored in dtype
+        Raises ValueError if the largest error of a power or of the energy of a load exceeds tolerance (relative to
+        the peak power or energy of the load).
+        """
+        for i in range(len(load)):
+            for column in ('P_ref [kW]', 'P_in', 'P_out'):
+                if column not in load[i].arrays:
+                    continue
+                power = load[i].arrays[column]
+                converted = power.astype(dtype).astype(float)
+                peak = np.nanmax(np.abs(power)) if np.any(np.isfinite(power)) else 0.0
+                error = np.nanmax(np.abs(converted - power)) if len(power) else 0.0
+                energy = np.nansum(power)
+                energy_error = abs(np.nansum(converted) - energy)
+                if not error <= tolerance * peak or not energy_error <= tolerance * abs(energy) + error:
+                    raise ValueError('Precision of ' + str(np.dtype(dtype)) + ' not sufficient for ' + column +
+                                     ' of ' + load[i].name + ' (max. error ' + str(error) + ' kW).')
+
+    def arrays(self, row, variable=True):
+        """
+        Function to get zero-copy views of one row
+        row: int
+            Row of equipment device
+        variable: bool (default True)
+            Include P_in and P_out (manipulative loads only)
+        """
+        arrays = {'P_ref [kW]': self.p_ref[row], 'Status': self.status[row], 'Controllable': self.controllable[row]}
+        if variable:
+            arrays['P_in'] = self.p_in[row]
+            arrays['P_out'] = self.p_out[row]
+        return arrays
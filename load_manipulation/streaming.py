@@ -0,0 +1,191 @@
+"""
+Streaming module of HEyDU runs the load manipulation over long horizons in chunks
+
+Every chunk is simulated in a window that reaches past the chunk by the longest cycle plus compensation period, so
+cycles and compensation near the end of a chunk are complete. Cycle stamping (status and P_in) is carried from chunk to
+chunk and equals the stamping of the whole horizon, and the manipulated state of the overlapping time steps (and the
+curtailment it absorbed) is passed on to the next chunk. Only cycles starting within a chunk are manipulated in it,
+and results of a chunk are final when it is done.
+
+Chunks end in a night (no PV production) far enough from its start and end that no cycle, shift or compensation
+window of a manipulation crosses the border. Loads are manipulated chunk by chunk instead of over the whole horizon one
+after the other, but no manipulation in one chunk changes the curtailment seen in another, so the results equal a
+simulation of the whole horizon. A horizon without such nights is simulated as one chunk. Peak memory depends on chunk
+length (at least chunk, up to the next night) and number of devices, not on the horizon.
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import datetime as dt
+import numpy as np
+import pandas as pd
+import load_manipulation.charts as ch
+import load_manipulation.environment as env
+import load_manipulation.kernels as kn
+import load_manipulation.models as md
+import load_manipulation.operator as op
+import load_manipulation.target_function as tf
+
+
+class Stream:
+    """
+    Class to carry cycle stamping and manipulated state of one equipment device from chunk to chunk
+    """
+
+    def __init__(self, parameters, size):
+        """
+        parameters: dict
+            Keyword arguments of class Equipment
+        size: int
+            Length of horizon
+        """
+        self.parameters = parameters
+        self.power = parameters['profile']['P_ref [kW]'].to_numpy()
+        self.cycle = parameters['cycle']['P_cyc [kW]'].to_numpy(dtype=float)
+        self.size = size
+        # Cycle stamping: cycle starts before position decided are selected, busy is the end of the last cycle
+        self.decided = 0
+        self.busy = 0
+        self.starts = np.array([], dtype=np.int64)
+        # Manipulated state of previous chunk: (position, {column: np.ndarray})
+        self.carry = None
+
+    def create_profile(self, start, stop):
+        """
+        Function to create status and P_in of positions start to stop
+        start: int
+            First position
+        stop: int
+            Position after the last one
+        """
+        base_load = self.parameters['base_load']
+        length = len(self.cycle)
+        status = kn.classify_status(self.power, self.parameters.get('standby', 0), base_load, start, stop)
+        starts = np.flatnonzero(status == 2) + start
+        # Truncated cycles at the end of the horizon
+        status[starts[starts + length > self.size] - start] = 1
+        selected, self.busy = kn.select_starts(starts[starts >= self.decided], length, self.size, self.busy)
+        self.decided = max(self.decided, stop)
+        self.starts = np.concatenate((self.starts[self.starts + length > start], selected))
+        p_in = np.where(status == 1, base_load, 0.0)
+        kn.write_cycles(status, p_in, self.starts, self.cycle, start)
+        return status, p_in
+
+    def restore(self, load, start, stop):
+        """
+        Function to write profile and carried state into equipment device created for positions start to stop
+        load: object (class Equipment)
+            Equipment device of chunk
+        """
+        status, p_in = self.create_profile(start, stop)
+        load.arrays['Status'][:] = status
+        load.arrays['P_in'][:] = p_in
+        load.p_out()
+        if self.carry is not None:
+            position, arrays = self.carry
+            for column in arrays:
+                load.arrays[column][position - start:position - start + len(arrays[column])] = arrays[column]
+        self.carry = None
+
+    def keep(self, load, start, position):
+        """
+        Function to keep manipulated state of the time steps after position for the next chunk
+        load: object (class Equipment)
+            Equipment device of chunk
+        start: int
+            Position of the first time step of load
+        position: int
+            First time step of next chunk
+        """
+        self.carry = (position, {column: load.arrays[column][position - start:].copy()
+                                 for column in ('P_out', 'Status', 'Controllable')})
+
+
+def chunk_borders(pv, size, i_chunk, lookahead):
+    """
+    Function to find the chunks of a horizon: every chunk ends in a run without PV production (target function status
+    0) at least lookahead time steps after the start and before the end of the run, so no cycle, shift or
+    compensation of a manipulation crosses a border
+    pv: np.ndarray
+        PV production [kW]
+    size: int
+        Length of horizon
+    i_chunk: int
+        Minimum length of chunk
+    lookahead: int
+        Time steps after a cycle start that can take part in its manipulation
+    return: list
+        (start, stop) positions of chunks (one chunk if there is no such run)
+    """
+    begin, end, night = kn.run_lengths(np.asarray(pv)[:size] < 0.1)
+    begin, end = begin[night] + lookahead, end[night] - lookahead
+    begin, end = begin[begin <= end], end[begin <= end]
+    chunks = []
+    start = 0
+    while start < size:
+        j = np.searchsorted(end, start + i_chunk)
+        stop = size if start + i_chunk >= size or j == len(end) else max(start + i_chunk, int(begin[j]))
+        chunks.append((start, stop))
+        start = stop
+    return chunks
+
+
+def run_streaming(equipment, target_function, chunk=dt.timedelta(days=7), callback=None):
+    """
+    Function to run load manipulation for all equipment chunk by chunk
+    equipment: list
+        Keyword arguments of class Equipment for every device (dict); profiles cover the target function
+    target_function: pd.DataFrame or object (class TargetFunction)
+        Target Function (e.g. memory-mapped by loader.read_csv())
+    chunk: dt.timedelta (default 7 days)
+        Minimum length of chunk (chunks end in the next night, see chunk_borders())
+    callback: function (default None)
+        Called with the target function and the loads (dict name: pd.DataFrame) of every finished chunk
+    return: pd.DataFrame
+        Reference and optimized curtailment of every chunk
+    """
+    if isinstance(target_function, tf.TargetFunction):
+        target_function = target_function.load()
+    size = len(target_function.index)
+    timestep = equipment[0].get('timestep', dt.timedelta(minutes=1))
+    i_chunk = max(int(chunk / timestep), 1)
+    # Cycle plus compensation of the last cycle start in a chunk (cap: compensation after the capped cycle)
+    variable = [parameters for parameters in equipment if parameters['manipulation_type'] is not None]
+    lookahead = 1
+    for parameters in variable:
+        lookahead = max(lookahead, 2 * len(parameters['cycle'].index) + int(parameters['period'] / timestep) + 1)
+    streams = [None if parameters['manipulation_type'] is None else Stream(parameters, size)
+               for parameters in equipment]
+    rows = []
+    for start, stop in chunk_borders(target_function['PV [kW]'].to_numpy(), size, i_chunk, lookahead):
+        # Window: predecessor of first time step (status), chunk and lookahead
+        window_start = max(start - 1, 0)
+        window_stop = min(stop + lookahead, size)
+        load = []
+        for i in range(len(equipment)):
+            parameters = dict(equipment[i], profile=equipment[i]['profile'].iloc[window_start:window_stop])
+            load.append(md.Equipment(**parameters))
+            if streams[i] is not None:
+                streams[i].restore(load[-1], window_start, window_stop)
+        target = target_function.iloc[window_start:window_stop][['PV [kW]', 'Ref. Curtailment [kW]']].copy()
+        operator = op.Operator(env.Environment(load), target, ch.Renderer('off'))
+        if start > 0:
+            # Curtailment of the overlap absorbed by manipulations of previous chunk
+            operator.carry_curtailment()
+        for i in range(len(operator.env.variable_load)):
+            operator.load_manipulation(i, False, start - window_start, stop - window_start)
+        for i in range(len(equipment)):
+            if streams[i] is not None:
+                streams[i].keep(load[i], window_start, max(stop - 1, 0))
+        # Results of chunk
+        core = operator.target_func.iloc[start - window_start:stop - window_start]
+        rows.append({'Start': core.index[0], 'Stop': core.index[-1],
+                     'Ref. Curtailment [kWh]': core['Ref. Curtailment [kW]'].sum() / operator.axis.per_hour,
+                     'Curtailment [kWh]': core['Curtailment [kW]'].sum() / operator.axis.per_hour})
+        if callback is not None:
+            callback(core, {load[i].name: load[i].df.iloc[start - window_start:stop - window_start]
+                            for i in range(len(load))})
+    return pd.DataFrame(rows)
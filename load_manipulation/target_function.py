@@ -1,6 +1,9 @@
 """
 Module to implement target function
 
+The target function is loaded on first use (TargetFunction.load() or attribute target_function of this module), so
+importing the package does not read any CSV.
+
 @author: Paul Bohn
 """
 
@@ -8,15 +11,62 @@ __version__ = "0.1"
 __author__ = "Paul Bohn"
 
 import os
-import pandas as pd
+import load_manipulation.loader as ld
 
 # Set directory
 root = os.path.dirname(os.path.abspath(''))
 func = '/data/target_function/target_function.csv'
 directory = root + func
 
+# Loaded target functions: (path, start, stop, columns, modification time) -> pd.DataFrame
+loaded = {}
+
+
+class TargetFunction:
+    """
+    Class to provide the target function (loaded lazily and memoized)
+    """
+
+    def __init__(self, path=None, start=None, stop=None, columns=None, cache_dir=None):
+        """
+        path: str (default None)
+            Path of target function CSV (None: data/target_function/target_function.csv next to the working directory)
+        start: dt.datetime (default None)
+            First time step (None: start of CSV)
+        stop: dt.datetime (default None)
+            Last time step (None: end of CSV)
+        columns: list (default None)
+            Columns to load (None: all columns)
+        cache_dir: str (default None)
+            Cache root of loader (see loader.read_csv())
+        """
+        self.path = directory if path is None else path
+        self.start = start
+        self.stop = stop
+        self.columns = columns
+        self.cache_dir = cache_dir
+
+    def load(self):
+        """
+        Function to load the target function (read once per path, range, columns and file version)
+        return: pd.DataFrame
+            Target function (shared, use copy() before modifying)
+        """
+        path = os.path.abspath(self.path)
+        key = (path, self.start, self.stop, None if self.columns is None else tuple(self.columns),
+               os.stat(path).st_mtime_ns)
+        if key not in loaded:
+            df = ld.read_csv(path, self.cache_dir)
+            if self.columns is not None:
+                df = df[list(self.columns)]
+            loaded[key] = df.loc[self.start:self.stop]
+        return loaded[key]
 
-# Import CSV Data
-target_function = pd.read_csv(directory, header=0, sep=';', index_col=0, decimal=',')
-target_function.index = pd.to_datetime(target_function.index)
 
+def __getattr__(name):
+    """
+    Function to load the default target function on first access of attribute target_function
+    """
+    if name == 'target_function':
+        return TargetFunction().load()
+    raise AttributeError('module ' + __name__ + ' has no attribute ' + name)
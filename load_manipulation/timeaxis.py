@@ -0,0 +1,112 @@
+"""
+Time axis module of HEyDU maps the time steps of a horizon to integer positions
+
+Models and operator address time steps by position (and time spans by number of time steps); timestamps are only
+created or resolved at the API boundary (e.g. Equipment.shift(clock, step), Operator.shift_comp_times(), plans and
+printed messages). Every resolution works, the step is taken from Equipment.timestep or the index.
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import datetime as dt
+import numpy as np
+import pandas as pd
+
+
+class TimeAxis:
+    """
+    Class to convert between timestamps and positions of an equidistant horizon
+    """
+
+    def __init__(self, start, step=dt.timedelta(minutes=1), size=0):
+        """
+        start: dt.datetime
+            First time step (position 0)
+        step: dt.timedelta (default minutes=1)
+            Time resolution
+        size: int (default 0)
+            Number of time steps
+        """
+        self.start = pd.Timestamp(start)
+        self.step = pd.Timedelta(step).to_pytimedelta()
+        self.size = int(size)
+        # Time steps per hour: energy [kWh] = sum of power [kW] / per_hour
+        self.per_hour = dt.timedelta(hours=1) / self.step
+
+    @classmethod
+    def from_index(cls, index, step=None):
+        """
+        Function to create the time axis of an index
+        index: pd.DatetimeIndex
+            Time steps of horizon
+        step: dt.timedelta (default None)
+            Time resolution (None: distance of the first two time steps, 1 minute for a single time step)
+        """
+        if step is None:
+            step = index[1] - index[0] if len(index) > 1 else dt.timedelta(minutes=1)
+        return cls(index[0], step, len(index))
+
+    def position(self, clock):
+        """
+        Function to get the position of a timestamp
+        clock: dt.datetime
+            Time step of horizon
+        return: int
+            Position (KeyError: clock is not a time step of horizon)
+        """
+        delta = pd.Timestamp(clock) - self.start
+        position = delta // self.step
+        if position < 0 or position >= self.size or delta % self.step:
+            raise KeyError(clock)
+        return int(position)
+
+    def positions(self, clocks):
+        """
+        Function to get the positions of several timestamps
+        clocks: list
+            Time steps of horizon (dt.datetime)
+        return: np.ndarray
+            Positions
+        """
+        return np.array([self.position(clock) for clock in clocks], dtype=np.int64)
+
+    def clock(self, position):
+        """
+        Function to get the timestamp of a position
+        position: int
+            Position in horizon
+        return: pd.Timestamp
+            Time step
+        """
+        return self.start + int(position) * self.step
+
+    def steps(self, duration):
+        """
+        Function to convert a time span into time steps (rounded down)
+        duration: dt.timedelta
+            Time span
+        return: int
+            Number of time steps
+        """
+        return int(duration / self.step)
+
+    def duration(self, steps):
+        """
+        Function to convert time steps into a time span
+        steps: int
+            Number of time steps
+        return: dt.timedelta
+            Time span
+        """
+        return int(steps) * self.step
+
+    def index(self):
+        """
+        Function to create the index of the horizon
+        return: pd.DatetimeIndex
+            Time steps
+        """
+        return pd.date_range(self.start, periods=self.size, freq=self.step, name='Time')
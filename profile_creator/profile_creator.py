@@ -1,112 +1,310 @@
-"""Tool for creating the loadprofiles"""
+"""
+Profile creator of HEyDU turns raw load profiles (Fraunhofer UMSICHT, lp_*.csv) into profiles and cycles of class
+Equipment
 
-#TODO: create new csv with headlines,
+Pipeline per device (array operations, devices in parallel on a process pool):
+    - normalization to nominal load (maximum of profile)
+    - standby (minimum of normalized profile * standby_factor) and base load (quantile of normalized profile) [kW]
+    - status classification and cycle stamping (kernels of load_manipulation, as in Equipment)
 
-from pathlib import Path
-import pandas as pd
-import numpy as np
-import datetime as dt
-from glob import glob
+Output (semicolon separated, comma decimal, see load_manipulation.loader):
+    <output>/profiles/<name>.csv        P_ref [kW], Status, P_in [kW]
+    <output>/cycles/<name>_cycle.csv    P_cyc [kW]
+    <output>/parameters.csv             power, base_load and standby of every device [kW]
 
+Derived profiles and parameters are cached in <output>/.profile_cache, keyed by the content hashes of raw profile and
+cycle and the parameters of the pipeline. A re-run only processes devices with changed input or missing output;
+entries of unchanged content are reused after renaming or reverting a file.
+
+    python -m profile_creator.profile_creator raw/ data/ --cycles raw/cycles/
+
+@author: Paul Bohn, Moritz End
 """
-@autor: Paul Bohn, Moritz End
-"""
 
+__version__ = "0.1"
+__author__ = "Paul Bohn, Moritz End"
+
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import load_manipulation.kernels as kn
+import load_manipulation.loader as ld
+
+# Format of raw CSVs: semicolon separated, thousands separator '.', decimal ','
+raw_format = {'header': 0, 'sep': ';', 'index_col': 0, 'thousands': '.', 'decimal': ','}
+# Format of output CSVs (see load_manipulation.loader.csv_format)
+output_format = {'sep': ';', 'decimal': ','}
+
+
+def read_raw(path):
+    """
+    Function to read a raw profile or cycle
+    path: str
+        Path of CSV (first column: power [kW])
+    return: pd.Series
+        Power [kW] with time index
+    """
+    df = pd.read_csv(path, **raw_format)
+    power = df.iloc[:, 0].astype(float)
+    power.index = pd.to_datetime(power.index, dayfirst=True)
+    power.index.name = 'Time'
+    return power
+
+
+def normalize(power):
+    """
+    Function to normalize a profile to its nominal load
+    power: np.ndarray
+        Power [kW]
+    return: (float, np.ndarray)
+        Nominal load [kW] (maximum) and normalized power
+    """
+    nominal = float(np.max(power)) if len(power) else 0.0
+    if nominal <= 0:
+        return nominal, np.zeros(len(power))
+    return nominal, power / nominal
 
 
-filenames_profiles = glob('C:/Users/moend/sciebo/2020_Masterprojekt_Bohn_End/HEyDU/Loadprofiles_Fraunhofer_Umsicht/lp_*.csv')
-data_profiles = [pd.read_csv(f, header=0, sep=';', index_col=0,
-                          converters={1: lambda x: float(x.replace('.', '').replace(',', '.'))})
-              for f in filenames_profiles]
+def thresholds(normalized, nominal, standby_factor=1.1, base_quantile=0.2):
+    """
+    Function to calculate standby and base load
+    normalized: np.ndarray
+        Normalized power
+    nominal: float
+        Nominal load [kW]
+    standby_factor: float (default 1.1)
+        Factor of minimum for standby
+    base_quantile: float (default 0.2)
+        Quantile for base load
+    return: (float, float)
+        Standby and base load [kW]
+    """
+    if len(normalized) == 0:
+        return 0.0, 0.0
+    standby = float(np.min(normalized)) * standby_factor * nominal
+    base_load = float(np.quantile(normalized, base_quantile)) * nominal
+    return standby, base_load
 
-filenames_cycles = glob('C:/Users/moend/sciebo/2020_Masterprojekt_Bohn_End/HEyDU/Loadprofiles_Fraunhofer_Umsicht/cycles/lp_*.csv')
-data_cycles = [pd.read_csv(f, header=0, sep=';', index_col=0,
-                          converters={1: lambda x: float(x.replace('.', '').replace(',', '.'))})
-              for f in filenames_cycles]
 
-nominal_load = []
-standby = []
-baseload = []
+def create_profile(power, cycle=None, standby_factor=1.1, base_quantile=0.2):
+    """
+    Function to create the profile of one device
+    power: pd.Series
+        Raw profile [kW]
+    cycle: pd.Series (default None)
+        Raw cycle [kW] (None: fixed load, no cycle stamping)
+    standby_factor: float (default 1.1)
+        Factor of minimum for standby
+    base_quantile: float (default 0.2)
+        Quantile for base load
+    return: (pd.DataFrame, dict)
+        Profile (P_ref [kW], Status, P_in [kW]) and parameters (power, base_load, standby [kW])
+    """
+    p_ref = power.to_numpy(dtype=float)
+    nominal, normalized = normalize(p_ref)
+    standby, base_load = thresholds(normalized, nominal, standby_factor, base_quantile)
+    status = kn.classify_status(p_ref, standby, base_load)
+    if cycle is None:
+        p_in = p_ref.copy()
+    else:
+        status, p_in = kn.stamp_cycles(status, cycle.to_numpy(dtype=float), base_load)
+    profile = pd.DataFrame({'P_ref [kW]': p_ref, 'Status': status.astype(np.int8), 'P_in [kW]': p_in},
+                           index=power.index)
+    return profile, {'power': nominal, 'base_load': base_load, 'standby': standby}
 
 
-def norm_profile(index):
-    nominal_load.append(data_profiles[index].max())
-    print(nominal_load[index])
-    data_profiles[index]['P_nominal'] = data_profiles[index]['P'].div(int(nominal_load[index]))
-    return data_profiles[index]
+def cache_key(profile_path, cycle_path, standby_factor=1.1, base_quantile=0.2):
+    """
+    Function to create the cache key of a device from the content of its input
+    profile_path: str
+        Raw profile
+    cycle_path: str
+        Raw cycle (None: fixed load)
+    return: str
+        Hash of raw profile, raw cycle and parameters
+    """
+    content = [__version__, ld.file_hash(profile_path), None if cycle_path is None else ld.file_hash(cycle_path),
+               standby_factor, base_quantile]
+    return hashlib.sha256(json.dumps(content).encode()).hexdigest()
 
-def calculate_standby(index):
-    standby.append(np.amin((data_profiles[index]['P_nominal']*1.1)))
 
-def calculate_baseload(index):
-    baseload.append(np.quantile(data_profiles[index]['P_nominal'], 0.2))
+def process_device(name, profile_path, cycle_path, output_dir, standby_factor=1.1, base_quantile=0.2, key=None,
+                   cache_dir=None):
+    """
+    Function to read, create and write the profile (and cycle) of one device (runs in worker process)
+    name: str
+        Name of device (file name without extension)
+    profile_path: str
+        Raw profile
+    cycle_path: str
+        Raw cycle (None: fixed load)
+    output_dir: str
+        Output directory
+    key: str (default None)
+        Cache key of device (see cache_key())
+    cache_dir: str (default None)
+        Cache directory (None: no cache)
+    return: dict
+        Parameters of device (name, power, base_load, standby, cycle length)
+    """
+    cycle = None if cycle_path is None else read_raw(cycle_path)
+    entry = None if cache_dir is None else os.path.join(cache_dir, key)
+    meta = None if entry is None else ld.read_meta(entry)
+    if meta is not None:
+        profile, parameters = ld.load_cache(entry, meta), meta['parameters']
+    else:
+        profile, parameters = create_profile(read_raw(profile_path), cycle, standby_factor, base_quantile)
+        if entry is not None:
+            ld.write_cache(entry, profile, {'parameters': parameters})
+    profile.to_csv(os.path.join(output_dir, 'profiles', name + '.csv'), **output_format)
+    if cycle is not None:
+        cycle.rename('P_cyc [kW]').to_frame().to_csv(os.path.join(output_dir, 'cycles', name + '_cycle.csv'),
+                                                     **output_format)
+    return dict(name=name, cycle_length=0 if cycle is None else len(cycle), **parameters)
 
-def status(place):
-    for i in range(len(data_profiles[place].index)):
-        current_status = data_profiles[place].loc[data_profiles[place].index[i], 'Status']
-        current_power = data_profiles[place].loc[data_profiles[place].index[i], 'P']
-        if i == 0:
-            if current_power <= standby:
-                current_status = 0
-            elif current_power > baseload:
-                current_status = 2
-            else:
-                current_status = 1
+
+def find_devices(input_dir, cycle_dir=None, pattern='lp_*.csv'):
+    """
+    Function to find raw profiles and their cycles (same file name in cycle directory)
+    input_dir: str
+        Directory of raw profiles
+    cycle_dir: str (default None)
+        Directory of raw cycles (None: <input_dir>/cycles)
+    pattern: str (default 'lp_*.csv')
+        File pattern of raw profiles
+    return: list
+        (name, profile path, cycle path or None) of every device
+    """
+    if cycle_dir is None:
+        cycle_dir = os.path.join(input_dir, 'cycles')
+    devices = []
+    for path in sorted(glob.glob(os.path.join(input_dir, pattern))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        cycle_path = os.path.join(cycle_dir, os.path.basename(path))
+        devices.append((name, path, cycle_path if os.path.isfile(cycle_path) else None))
+    return devices
+
+
+def create_profiles(input_dir, output_dir, cycle_dir=None, pattern='lp_*.csv', workers=None, standby_factor=1.1,
+                    base_quantile=0.2, cache=True):
+    """
+    Function to create profiles and cycles of all raw profiles of a directory in parallel
+    input_dir: str
+        Directory of raw profiles
+    output_dir: str
+        Output directory (profiles/, cycles/ and parameters.csv are created)
+    cycle_dir: str (default None)
+        Directory of raw cycles (None: <input_dir>/cycles)
+    pattern: str (default 'lp_*.csv')
+        File pattern of raw profiles
+    workers: int (default None)
+        Number of worker processes (None: number of CPUs, 1: run in this process)
+    standby_factor: float (default 1.1)
+        Factor of minimum for standby
+    base_quantile: float (default 0.2)
+        Quantile for base load
+    cache: bool (default True)
+        Process only devices with changed input or missing output (False: all devices, cache is not used)
+    return: pd.DataFrame
+        Parameters of every device
+    """
+    devices = find_devices(input_dir, cycle_dir, pattern)
+    for directory in ('profiles', 'cycles'):
+        os.makedirs(os.path.join(output_dir, directory), exist_ok=True)
+    cache_dir = os.path.join(output_dir, '.profile_cache') if cache else None
+    # Output of a device is up to date if the manifest holds the key of its current input
+    manifest = read_manifest(cache_dir)
+    rows = {}
+    arguments = []
+    for name, profile_path, cycle_path in devices:
+        key = cache_key(profile_path, cycle_path, standby_factor, base_quantile) if cache else None
+        entry = manifest.get(name)
+        if entry is not None and entry['key'] == key and outputs_exist(output_dir, name, cycle_path):
+            rows[name] = entry['row']
         else:
-            if current_power > baseload \
-                    and data_profiles[place].loc[data_profiles[place].index[i - 1], 'P'] > baseload:
-                current_status = 3
-            elif current_power > baseload \
-                    and data_profiles[place].loc[data_profiles[place].index[i - 1], 'P'] <= baseload:
-                current_status = 2
-            elif current_power <= standby:
-                current_status = 0
-            else:
-                current_status = 1
-        data_profiles[place].loc[data_profiles[place].index[i], 'Status'] = current_status
-
-
-
-def profile_creator(place):
-        for j in range(len(data_profiles[place].index)):
-            if data_profiles[place].loc[data_profiles[place].index[j], 'Status'] == 2:
-                # check when device is turned on
-                if len(data_profiles[place].index) - j > len(data_cycles[place].index):
-                    # check if remaining length is longer than cycle
-                    for i in range(len(data_cycles[place].index)):
-                        if i == 0:
-                            data_profiles[place].loc[data_profiles[place].index[j + i], 'Status'] = 2
-                            data_profiles[place].loc[data_profiles[place].index[j + i], 'P_in'] = data_cycles[place].loc[
-                                data_cycles[place].index[i], 'P_cycle']
-                        else:
-                            data_profiles[place].loc[data_profiles[place].index[j + i], 'Status'] = 3
-                            data_profiles[place].loc[data_profiles[place].index[j + i], 'P_in'] = data_cycles[place].loc[
-                                data_cycles[place].index[i], 'P_cycle']
-                            # print(cycle.loc[cycle.index[i], 'P_cyc [kW]'])
-                            k = j + i + 1
-                    while data_profiles[place].loc[data_profiles[place].index[k], 'Status'] == 3:
-                        data_profiles[place].loc[data_profiles[place].index[k], 'Status'] = 1
-                        k += 1
-            elif data_profiles[place].loc[data_profiles[place].index[j], 'Status'] == 1 or len(data_profiles.index) - j < len(data_cycles.index):
-                data_profiles[place].loc[data_profiles[place].index[j], 'P_in'] = baseload
-            data_profiles[place]['P_in'].fillna(baseload, inplace=True)
-
-
-# def turned_on(self):
-#         for i in range(len(data_profiles.index)):
-#             if data_profiles.loc[data_profiles.index[i], 'Status'] == 2:
-#                 on.append(start + dt.timedelta(minutes=i))
-
-
-for i in range(len(data_profiles)):
-    norm_profile(i)
-    data_profiles[i]['Status'] = np.nan
-    #data_profiles[i].index = pd.to_datetime(data_profiles[i]).index
-    calculate_standby(i)
-    calculate_baseload(i)
-    status(i)
-    profile_creator(i)
-
-print(baseload)
-print(standby)
-print(data_profiles)
+            arguments.append((name, profile_path, cycle_path, output_dir, standby_factor, base_quantile, key,
+                              cache_dir))
+    if workers == 1 or len(arguments) <= 1:
+        results = [process_device(*argument) for argument in arguments]
+    else:
+        context = mp.get_context('fork') if 'fork' in mp.get_all_start_methods() else None
+        with ProcessPoolExecutor(workers, mp_context=context) as executor:
+            results = list(executor.map(process_device, *zip(*arguments)))
+    for argument, row in zip(arguments, results):
+        rows[argument[0]] = row
+        manifest[argument[0]] = {'key': argument[6], 'row': row}
+    if cache:
+        # Devices without raw profile are dropped from the manifest
+        write_manifest(cache_dir, {name: manifest[name] for name, profile_path, cycle_path in devices})
+    parameters = pd.DataFrame([rows[name] for name, profile_path, cycle_path in devices],
+                              columns=['name', 'power', 'base_load', 'standby', 'cycle_length'])
+    parameters.to_csv(os.path.join(output_dir, 'parameters.csv'), index=False, **output_format)
+    return parameters
+
+
+def outputs_exist(output_dir, name, cycle_path):
+    """
+    Function to check if the output files of a device exist
+    """
+    if not os.path.isfile(os.path.join(output_dir, 'profiles', name + '.csv')):
+        return False
+    return cycle_path is None or os.path.isfile(os.path.join(output_dir, 'cycles', name + '_cycle.csv'))
+
+
+def read_manifest(cache_dir):
+    """
+    Function to read the manifest of a cache directory
+    cache_dir: str
+        Cache directory (None: no cache)
+    return: dict
+        {name: {'key': cache key, 'row': parameters}} of devices written to output
+    """
+    if cache_dir is None:
+        return {}
+    try:
+        with open(os.path.join(cache_dir, 'manifest.json')) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(cache_dir, manifest):
+    """
+    Function to write the manifest of a cache directory (replaced at once)
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, 'manifest.json')
+    with open(path + '.tmp', 'w') as file:
+        json.dump(manifest, file)
+    os.replace(path + '.tmp', path)
+
+
+def main(argv=None):
+    """
+    Function to run the profile creator from the command line
+    """
+    parser = argparse.ArgumentParser(description='Profile creator of HEyDU')
+    parser.add_argument('input', help='directory of raw profiles')
+    parser.add_argument('output', help='output directory')
+    parser.add_argument('--cycles', default=None, help='directory of raw cycles (default: <input>/cycles)')
+    parser.add_argument('--pattern', default='lp_*.csv', help='file pattern of raw profiles')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: number of CPUs)')
+    parser.add_argument('--standby-factor', type=float, default=1.1, help='factor of minimum for standby')
+    parser.add_argument('--base-quantile', type=float, default=0.2, help='quantile for base load')
+    parser.add_argument('--no-cache', action='store_true', help='process all devices')
+    args = parser.parse_args(argv)
+    parameters = create_profiles(args.input, args.output, args.cycles, args.pattern, args.workers,
+                                 args.standby_factor, args.base_quantile, not args.no_cache)
+    print(parameters.to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""
+Helpers of HEyDU tests to run synthetic portfolios (see benchmark.synthetic)
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import load_manipulation.charts as ch
+import load_manipulation.environment as env
+import load_manipulation.events as ev
+import load_manipulation.models as md
+import load_manipulation.operator as op
+
+
+def run_portfolio(equipment, target_function, windows=None, manipulate=True):
+    """
+    Function to create the operator of a portfolio (charts off, silent) and run load manipulation of all variable
+    loads over the whole horizon
+    equipment: list
+        Keyword arguments of class Equipment
+    target_function: pd.DataFrame
+        Target function (not modified)
+    windows: function (default None)
+        Called with operator and index of load, returns windows of load_manipulation() (None: segment windows)
+    manipulate: bool (default True)
+        Run load manipulation (False: operator without manipulation)
+    return: object (class Operator)
+    """
+    ev.set_verbosity(0)
+    load = [md.Equipment(**parameters) for parameters in equipment]
+    operator = op.Operator(env.Environment(load), target_function.copy(), ch.Renderer('off'))
+    for i in range(len(operator.env.variable_load) if manipulate else 0):
+        operator.load_manipulation(i, False, windows=None if windows is None else windows(operator, i))
+    return operator
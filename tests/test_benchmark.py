@@ -0,0 +1,33 @@
+"""
+Tests of benchmark module of HEyDU
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import pytest
+import benchmark.run_benchmark as rb
+
+
+def create_results(cycle_length, time, kernels='numpy', resolution=None):
+    """
+    Function to create benchmark results of one portfolio with equal time of every stage
+    """
+    record = {'devices': 10, 'days': 1, 'cycle_length': list(cycle_length), 'seed': 0}
+    record.update({stage: time for stage in rb.stages})
+    return {'kernels': kernels, 'resolution': resolution, 'results': [record]}
+
+
+def test_compare():
+    """
+    Portfolios are matched with cycle length, results of other backend or resolution are not compared
+    """
+    previous = create_results((5, 60), 1.0)
+    assert len(rb.compare(previous, create_results((5, 60), 2.0))) == len(rb.stages)
+    assert rb.compare(previous, create_results((5, 120), 2.0)) == []
+    with pytest.raises(ValueError):
+        rb.compare(previous, create_results((5, 60), 1.0, kernels='numba'))
+    with pytest.raises(ValueError):
+        rb.compare(previous, create_results((5, 60), 1.0, resolution=15.0))
@@ -0,0 +1,32 @@
+"""
+Tests of events module of HEyDU
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import datetime as dt
+import json
+import numpy as np
+import load_manipulation.events as ev
+
+
+def test_stream(tmp_path):
+    """
+    Records with NumPy scalars are written as JSON lines, every record reaches the file
+    """
+    path = str(tmp_path / 'events.jsonl')
+    ev.reset()
+    ev.stream(path)
+    for position in np.arange(100):
+        ev.record('Device 0', dt.datetime(2020, 6, 1) + dt.timedelta(minutes=int(position)), 'cap', position + 3,
+                  np.int64(5), np.float32(0.5))
+    ev.record('total', None, 'curtailment', energy=np.float64(1.5))
+    assert ev.close() == 0
+    with open(path) as file:
+        rows = [json.loads(line) for line in file]
+    assert len(rows) == len(ev.records) == 101
+    assert rows[0]['Offset'] == 3 and rows[-1]['Energy [kWh]'] == 1.5
+    ev.reset()
@@ -0,0 +1,104 @@
+"""
+Tests of kernels module of HEyDU: backends and windowed passes against full passes on synthetic portfolios (see
+benchmark.synthetic)
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import datetime as dt
+import numpy as np
+import pytest
+import benchmark.synthetic as sy
+import load_manipulation.kernels as kn
+from helpers import run_portfolio
+
+
+@pytest.fixture
+def backend():
+    """
+    Fixture to select a kernel backend in a test (NumPy backend afterwards)
+    """
+    def select(name):
+        if name == 'numba':
+            pytest.importorskip('numba')
+        return kn.set_backend(name)
+
+    yield select
+    kn.set_backend('numpy')
+
+
+def assert_identical(operator, other):
+    """
+    Function to check that two runs give identical loads and curtailment (bit by bit)
+    """
+    for load, other_load in zip(operator.env.variable_load, other.env.variable_load):
+        for column in ('P_in', 'P_out', 'Status', 'Controllable'):
+            assert np.array_equal(load.arrays[column], other_load.arrays[column]), (load.name, column)
+    assert np.array_equal(operator.target_func['Curtailment [kW]'].to_numpy(),
+                          other.target_func['Curtailment [kW]'].to_numpy())
+
+
+@pytest.mark.parametrize('seed', [0, 3])
+def test_backends(backend, seed):
+    """
+    NumPy and numba backend give bit-identical loads and curtailment
+    """
+    equipment, target_function = sy.create_portfolio(20, 2, seed=seed)
+    backend('numba')
+    compiled = run_portfolio(equipment, target_function)
+    backend('numpy')
+    assert_identical(run_portfolio(equipment, target_function), compiled)
+
+
+def test_cap_scores(backend):
+    """
+    NumPy and numba backend give bit-identical cap scores, also with manipulated time steps
+    """
+    equipment, target_function = sy.create_portfolio(20, 2, seed=4)
+    operator = run_portfolio(equipment, target_function)
+    tf_status = operator.target_func['Status'].to_numpy()
+    for load in operator.env.variable_load:
+        arguments = (load.arrays['P_in'], load.arrays['Status'], load.arrays['Controllable'], tf_status,
+                     operator.curtailment_sum)
+        for position in np.flatnonzero(load.arrays['Status'] == 2):
+            scores = []
+            for name in ('numpy', 'numba'):
+                backend(name)
+                scores.append(kn.cap_scores(*arguments, position, load.cycle_steps, load.cycle_steps,
+                                            max(load.period_steps, 1), load.cap_factor, load.base_load, 60))
+            for array, other in zip(*scores):
+                assert np.array_equal(array, other), (load.name, position)
+
+
+@pytest.mark.parametrize('name', ['numpy', 'numba'])
+def test_classify_windows(backend, name):
+    """
+    Status of windows (e.g. refresh after manipulation or chunks) is identical to the status of a full pass
+    """
+    backend(name)
+    equipment, target_function = sy.create_portfolio(10, 1, seed=1)
+    rng = np.random.default_rng(0)
+    for parameters in equipment:
+        power = parameters['profile']['P_ref [kW]'].to_numpy()
+        full = kn.classify_status(power, parameters['standby'], parameters['base_load'])
+        borders = np.concatenate(([0], np.sort(rng.choice(np.arange(1, len(power)), 20, replace=False)),
+                                  [len(power)]))
+        windows = [kn.classify_status(power, parameters['standby'], parameters['base_load'], start, stop)
+                   for start, stop in zip(borders[:-1], borders[1:])]
+        assert np.array_equal(np.concatenate(windows), full), parameters['name']
+
+
+@pytest.mark.parametrize('seed', [0, 3])
+def test_windows(seed):
+    """
+    Segment windows (default) and coarse windows give the manipulations of the whole horizon
+    """
+    equipment, target_function = sy.create_portfolio(20, 2, seed=seed)
+    whole = run_portfolio(equipment, target_function,
+                          lambda operator, i: [(0, len(operator.target_func.index))])
+    assert_identical(run_portfolio(equipment, target_function), whole)
+    assert_identical(run_portfolio(equipment, target_function,
+                                   lambda operator, i: operator.coarse_windows(i, dt.timedelta(minutes=15))), whole)
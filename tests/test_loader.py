@@ -0,0 +1,50 @@
+"""
+Tests of loader module of HEyDU: binary cache of CSVs
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import os
+import numpy as np
+import pandas as pd
+import load_manipulation.loader as ld
+
+
+def write_csv(path, power):
+    """
+    Function to write a profile CSV in the format of HEyDU
+    """
+    index = pd.date_range('2020-06-01', periods=len(power), freq='min', name='Time')
+    pd.DataFrame({'P_ref [kW]': power}, index=index).to_csv(path, sep=';', decimal=',')
+
+
+def test_cache(tmp_path, monkeypatch):
+    """
+    Unchanged (or only touched) CSVs are memory-mapped from the cache without parsing, rewritten CSVs are parsed and
+    their cache entry is rebuilt
+    """
+    path = str(tmp_path / 'profile.csv')
+    cache_dir = str(tmp_path / 'cache')
+    write_csv(path, np.arange(10.0))
+    parsed = []
+    parse_csv = ld.parse_csv
+    monkeypatch.setattr(ld, 'parse_csv', lambda *args: parsed.append(args) or parse_csv(*args))
+    assert ld.read_csv(path, cache_dir)['P_ref [kW]'].tolist() == list(range(10))
+    assert len(parsed) == 1
+    df = ld.read_csv(path, cache_dir)
+    assert len(parsed) == 1
+    assert isinstance(df['P_ref [kW]'].to_numpy().base, np.memmap)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    ld.read_csv(path, cache_dir)
+    assert len(parsed) == 1
+    # Same size, other content and modification time
+    write_csv(path, np.arange(10.0)[::-1])
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10 ** 9))
+    assert ld.read_csv(path, cache_dir)['P_ref [kW]'].tolist() == list(range(9, -1, -1))
+    assert len(parsed) == 2
+    assert ld.read_csv(path, cache_dir)['P_ref [kW]'].tolist() == list(range(9, -1, -1))
+    assert len(parsed) == 2
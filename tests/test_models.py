@@ -0,0 +1,39 @@
+"""
+Tests of models module of HEyDU on synthetic portfolios (see benchmark.synthetic)
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import numpy as np
+import benchmark.synthetic as sy
+import load_manipulation.events as ev
+import load_manipulation.models as md
+
+
+def create_load():
+    """
+    Function to create a variable load and the position of its first cycle start
+    """
+    equipment, target_function = sy.create_portfolio(5, 1, (20, 30), seed=0)
+    load = md.Equipment(**next(parameters for parameters in equipment if parameters['manipulation_type'] is not None))
+    return load, int(np.flatnonzero(load.arrays['Status'] == 2)[0])
+
+
+def test_cap_manipulated():
+    """
+    Caps are refused if capped or compensation window are already manipulated (P_out is kept)
+    """
+    ev.set_verbosity(0)
+    load, position = create_load()
+    for begin in (position + 2, position + 15):
+        load.arrays['Controllable'][:] = True
+        load.arrays['Controllable'][begin] = False
+        p_out = load.arrays['P_out'].copy()
+        assert not load.cap_at(position, 10, 5, 0.9)
+        assert np.array_equal(load.arrays['P_out'], p_out)
+    load.arrays['Controllable'][:] = True
+    assert load.cap_at(position, 10, 5, 0.9)
+    assert np.isclose(load.arrays['P_out'].sum(), load.arrays['P_in'].sum())
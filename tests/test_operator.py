@@ -0,0 +1,54 @@
+"""
+Tests of operator module of HEyDU on synthetic portfolios (see benchmark.synthetic)
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import pytest
+import benchmark.synthetic as sy
+import load_manipulation.charts as ch
+import load_manipulation.environment as env
+import load_manipulation.events as ev
+import load_manipulation.models as md
+import load_manipulation.operator as op
+from helpers import run_portfolio
+
+
+@pytest.mark.parametrize('devices, days, cycle_length, seed', [(30, 3, (5, 40), 4), (20, 2, (5, 60), 1),
+                                                               (20, 2, (5, 60), 2), (20, 2, (5, 60), 3),
+                                                               (20, 2, (5, 60), 4)])
+def test_energy(devices, days, cycle_length, seed):
+    """
+    Manipulations move energy, they do not create or lose it: compensation windows of caps are not overwritten by
+    manipulations of other cycles. Standby is removed from the portfolio, a cycle shifted over standby time steps
+    leaves base load behind.
+    """
+    equipment, target_function = sy.create_portfolio(devices, days, cycle_length, seed=seed)
+    operator = run_portfolio([dict(parameters, standby=-1.0) for parameters in equipment], target_function)
+    for load in operator.env.variable_load:
+        assert load.arrays['P_out'].sum() == pytest.approx(load.arrays['P_in'].sum()), load.name
+
+
+def test_target_function_column_load():
+    """
+    A target function DataFrame with a column named load is used as DataFrame
+    """
+    equipment, target_function = sy.create_portfolio(5, 1, seed=0)
+    operator = run_portfolio(equipment, target_function.assign(load=0.0), manipulate=False)
+    assert 'load' in operator.target_func.columns
+
+
+def test_no_curtailment(tmp_path):
+    """
+    Without reference curtailment, total_load() renders the line chart into a file and no pie chart
+    """
+    ev.set_verbosity(0)
+    equipment, target_function = sy.create_portfolio(5, 1, seed=0)
+    load = [md.Equipment(**parameters) for parameters in equipment]
+    renderer = ch.Renderer('file', str(tmp_path))
+    operator = op.Operator(env.Environment(load), target_function.assign(**{'Ref. Curtailment [kW]': 0.0}), renderer)
+    operator.total_load()
+    assert [path.name for path in tmp_path.iterdir()] == ['001_line_chart_total.png']
@@ -0,0 +1,98 @@
+"""
+Tests of optimizer module of HEyDU on synthetic portfolios (see benchmark.synthetic)
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import sys
+import types
+import numpy as np
+import pytest
+import benchmark.synthetic as sy
+import load_manipulation.events as ev
+import load_manipulation.optimizer as om
+from helpers import run_portfolio
+
+
+def run_total(equipment, target_function, optimizer=True, **kwargs):
+    """
+    Function to run total_load() of a portfolio with or without optimizer
+    kwargs:
+        Arguments of class Optimizer
+    return: (object, pd.DataFrame)
+        Operator (class Operator) and event log of the run
+    """
+    operator = run_portfolio(equipment, target_function, manipulate=False)
+    ev.reset()
+    operator.total_load(om.Optimizer(operator, **kwargs) if optimizer else None)
+    events = ev.table()
+    ev.reset()
+    return operator, events
+
+
+def curtailment(operator):
+    """
+    Function to get the optimized curtailment of an operator [kWh]
+    """
+    return operator.target_func['Curtailment [kW]'].sum() / operator.axis.per_hour
+
+
+@pytest.mark.parametrize('seed', [0, 1, 5])
+def test_solve(seed):
+    """
+    The plan of the optimizer is applied without refused manipulations and leaves at most the curtailment of the
+    greedy load manipulation
+    """
+    pytest.importorskip('scipy')
+    equipment, target_function = sy.create_portfolio(12, 2, seed=seed)
+    greedy, events = run_total(equipment, target_function, optimizer=False)
+    optimized, events = run_total(equipment, target_function, time_limit=30)
+    assert not events['Action'].str.contains('refused').any()
+    assert events['Action'].isin(['shift', 'cap']).any()
+    assert curtailment(optimized) <= curtailment(greedy) + 1e-9
+
+
+def assert_greedy(equipment, target_function):
+    """
+    Function to check that total_load() with optimizer gives the greedy load manipulation
+    """
+    greedy, events = run_total(equipment, target_function, optimizer=False)
+    fallback, events = run_total(equipment, target_function)
+    for load, other in zip(fallback.env.variable_load, greedy.env.variable_load):
+        assert np.array_equal(load.arrays['P_out'], other.arrays['P_out']), load.name
+    assert curtailment(fallback) == curtailment(greedy)
+
+
+def test_without_scipy(monkeypatch):
+    """
+    Without scipy, total_load() falls back to the greedy load manipulation (the plan of the optimizer differs for this
+    portfolio, see test_solve())
+    """
+    monkeypatch.setitem(sys.modules, 'scipy', None)
+    equipment, target_function = sy.create_portfolio(12, 2, seed=1)
+    assert_greedy(equipment, target_function)
+
+
+def test_failed_solve(monkeypatch):
+    """
+    Without solution of the solver (e.g. time limit), total_load() falls back to the greedy load manipulation
+    """
+    optimize = pytest.importorskip('scipy.optimize')
+    monkeypatch.setattr(optimize, 'milp', lambda *args, **kwargs: types.SimpleNamespace(
+        x=None, message='Time limit reached.'))
+    equipment, target_function = sy.create_portfolio(12, 2, seed=1)
+    assert_greedy(equipment, target_function)
+
+
+def test_fallback_silent(monkeypatch, capsys):
+    """
+    The fallback is recorded as event and printed from verbosity 1 only
+    """
+    monkeypatch.setitem(sys.modules, 'scipy', None)
+    equipment, target_function = sy.create_portfolio(5, 1, seed=0)
+    operator, events = run_total(equipment, target_function)
+    assert capsys.readouterr().out == ''
+    assert events[events['Action'] == 'fallback']['Device'].tolist() == ['optimizer']
@@ -0,0 +1,120 @@
+"""
+Tests of profile creator of HEyDU: cache, manifest and regeneration of outputs
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import os
+import json
+import numpy as np
+import pandas as pd
+import profile_creator.profile_creator as pc
+
+
+def write_raw(path, power):
+    """
+    Function to write a raw profile or cycle in the format of the profile creator (see profile_creator.raw_format)
+    """
+    index = pd.date_range('2020-06-01', periods=len(power), freq='min').strftime('%d.%m.%Y %H:%M')
+    pd.DataFrame({'Power [kW]': power}, index=pd.Index(index, name='Time')).to_csv(path, sep=';', decimal=',')
+
+
+def raw_power(seed, size=240):
+    """
+    Function to create a raw profile with standby, base load and cycles of 20 minutes
+    """
+    rng = np.random.default_rng(seed)
+    power = np.full(size, 0.1)
+    power[size // 4:] = 0.5
+    for begin in range(size // 4, size - 20, 60):
+        power[begin:begin + 20] = 2.0
+    return np.round(power + rng.uniform(0, 0.01, size), 3)
+
+
+def create(tmp_path, monkeypatch):
+    """
+    Function to run the profile creator in this process and return the names of processed devices
+    """
+    processed = []
+    process_device = pc.process_device
+    monkeypatch.setattr(pc, 'process_device', lambda *args: processed.append(args[0]) or process_device(*args))
+    parameters = pc.create_profiles(str(tmp_path / 'raw'), str(tmp_path / 'data'), workers=1)
+    return processed, parameters
+
+
+def read_manifest(tmp_path):
+    """
+    Function to read the manifest of the output directory
+    """
+    with open(tmp_path / 'data' / '.profile_cache' / 'manifest.json') as file:
+        return json.load(file)
+
+
+def setup_raw(tmp_path):
+    """
+    Function to write three raw profiles, lp_b with a raw cycle
+    """
+    os.makedirs(tmp_path / 'raw' / 'cycles')
+    for i, name in enumerate(['lp_a', 'lp_b', 'lp_c']):
+        write_raw(tmp_path / 'raw' / (name + '.csv'), raw_power(i))
+    write_raw(tmp_path / 'raw' / 'cycles' / 'lp_b.csv', np.full(20, 2.0))
+
+
+def test_modified_profile(tmp_path, monkeypatch):
+    """
+    Modifying one raw profile rebuilds only that device, unchanged devices are taken from the manifest
+    """
+    setup_raw(tmp_path)
+    processed, parameters = create(tmp_path, monkeypatch)
+    assert processed == ['lp_a', 'lp_b', 'lp_c']
+    processed, unchanged = create(tmp_path, monkeypatch)
+    assert processed == []
+    pd.testing.assert_frame_equal(unchanged, parameters)
+    write_raw(tmp_path / 'raw' / 'lp_c.csv', raw_power(2) * 2)
+    key = read_manifest(tmp_path)['lp_c']['key']
+    processed, modified = create(tmp_path, monkeypatch)
+    assert processed == ['lp_c']
+    assert read_manifest(tmp_path)['lp_c']['key'] != key
+    assert np.isclose(modified.loc[2, 'power'], 2 * parameters.loc[2, 'power'])
+    pd.testing.assert_frame_equal(modified.iloc[:2], parameters.iloc[:2])
+    profile = pd.read_csv(tmp_path / 'data' / 'profiles' / 'lp_c.csv', sep=';', decimal=',')
+    assert np.allclose(profile['P_ref [kW]'], raw_power(2) * 2)
+
+
+def test_deleted_output(tmp_path, monkeypatch):
+    """
+    Deleting an output file regenerates it (from the cache, without creating the profile again)
+    """
+    setup_raw(tmp_path)
+    create(tmp_path, monkeypatch)
+    profile = tmp_path / 'data' / 'profiles' / 'lp_a.csv'
+    cycle = tmp_path / 'data' / 'cycles' / 'lp_b_cycle.csv'
+    content = profile.read_bytes(), cycle.read_bytes()
+    os.remove(profile)
+    os.remove(cycle)
+    created = []
+    create_profile = pc.create_profile
+    monkeypatch.setattr(pc, 'create_profile', lambda *args: created.append(args) or create_profile(*args))
+    processed, parameters = create(tmp_path, monkeypatch)
+    assert processed == ['lp_a', 'lp_b']
+    assert created == []
+    assert (profile.read_bytes(), cycle.read_bytes()) == content
+
+
+def test_removed_profile(tmp_path, monkeypatch):
+    """
+    Removing a raw profile drops the device from manifest.json and parameters.csv
+    """
+    setup_raw(tmp_path)
+    create(tmp_path, monkeypatch)
+    assert sorted(read_manifest(tmp_path)) == ['lp_a', 'lp_b', 'lp_c']
+    os.remove(tmp_path / 'raw' / 'lp_b.csv')
+    processed, parameters = create(tmp_path, monkeypatch)
+    assert processed == []
+    assert sorted(read_manifest(tmp_path)) == ['lp_a', 'lp_c']
+    assert parameters['name'].tolist() == ['lp_a', 'lp_c']
+    written = pd.read_csv(tmp_path / 'data' / 'parameters.csv', sep=';', decimal=',')
+    assert written['name'].tolist() == ['lp_a', 'lp_c']
@@ -0,0 +1,99 @@
+"""
+Tests of streaming module of HEyDU: chunked simulation against the whole horizon on synthetic portfolios (see
+benchmark.synthetic)
+
+@author: Paul Bohn
+"""
+
+__version__ = "0.1"
+__author__ = "Paul Bohn"
+
+import datetime as dt
+import numpy as np
+import pandas as pd
+import pytest
+import benchmark.synthetic as sy
+import load_manipulation.charts as ch
+import load_manipulation.environment as env
+import load_manipulation.events as ev
+import load_manipulation.operator as op
+import load_manipulation.streaming as st
+from helpers import run_portfolio
+
+
+def run_chunks(equipment, target_function, chunk):
+    """
+    Function to run the streaming simulation and collect the chunks
+    return: (pd.DataFrame, dict)
+        Curtailment of every chunk and loads (name: pd.DataFrame) of the whole horizon
+    """
+    chunks = {}
+
+    def keep(core, loads):
+        for name in loads:
+            chunks.setdefault(name, []).append(loads[name])
+
+    result = st.run_streaming(equipment, target_function, chunk, keep)
+    return result, {name: pd.concat(chunks[name]) for name in chunks}
+
+
+@pytest.mark.parametrize('manipulation_type', ['Cap', 'Cap/Shift', 'Shift'])
+def test_single_load(manipulation_type):
+    """
+    With one variable load, chunks give the manipulations of the whole horizon
+    """
+    ev.set_verbosity(0)
+    equipment, target_function = sy.create_portfolio(12, 2, seed=3)
+    equipment = [next(parameters for parameters in equipment if parameters['manipulation_type'] == manipulation_type)
+                 ] + [parameters for parameters in equipment if parameters['manipulation_type'] is None]
+    whole = run_portfolio(equipment, target_function).env.variable_load[0]
+    result, loads = run_chunks(equipment, target_function, dt.timedelta(hours=3))
+    for column in ('P_in', 'P_out', 'Status'):
+        assert np.array_equal(loads[whole.name][column].to_numpy(), whole.arrays[column]), column
+
+
+@pytest.mark.parametrize('seed, days', [(2, 2), (3, 2), (7, 4)])
+@pytest.mark.parametrize('hours', [3, 6])
+def test_portfolio(seed, days, hours):
+    """
+    With several variable loads (Cap and Shift), chunks give the manipulations and curtailment of the whole horizon
+    """
+    ev.set_verbosity(0)
+    equipment, target_function = sy.create_portfolio(20, days, seed=seed)
+    assert {'Cap', 'Shift'} <= {parameters['manipulation_type'] for parameters in equipment}
+    whole = run_portfolio(equipment, target_function)
+    result, loads = run_chunks(equipment, target_function, dt.timedelta(hours=hours))
+    assert len(result.index) > 1
+    for load in whole.env.variable_load:
+        for column in ('P_in', 'P_out', 'Status'):
+            assert np.array_equal(loads[load.name][column].to_numpy(), load.arrays[column]), (load.name, column)
+    assert result['Curtailment [kWh]'].sum() == pytest.approx(
+        whole.target_func['Curtailment [kW]'].sum() / whole.axis.per_hour)
+    assert result['Ref. Curtailment [kWh]'].sum() == pytest.approx(
+        whole.target_func['Ref. Curtailment [kW]'].sum() / whole.axis.per_hour)
+
+
+def test_chunk_borders():
+    """
+    Chunks cover the horizon and end in nights at least lookahead time steps from day time
+    """
+    equipment, target_function = sy.create_portfolio(5, 4, seed=0)
+    pv = target_function['PV [kW]'].to_numpy()
+    chunks = st.chunk_borders(pv, len(pv), 180, 120)
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(pv) and len(chunks) > 4
+    for (start, stop), (following, end) in zip(chunks[:-1], chunks[1:]):
+        assert stop == following and stop - start >= 180
+        assert np.all(pv[stop - 120:stop + 120] < 0.1)
+    assert st.chunk_borders(pv, len(pv), 180, 1440) == [(0, len(pv))]
+
+
+def test_carry_curtailment():
+    """
+    An operator of manipulated loads removes the curtailment they absorbed
+    """
+    ev.set_verbosity(0)
+    equipment, target_function = sy.create_portfolio(20, 2, seed=3)
+    operator = run_portfolio(equipment, target_function)
+    carried = op.Operator(env.Environment(operator.env.load), target_function.copy(), ch.Renderer('off'))
+    carried.carry_curtailment()
+    assert np.allclose(carried.target_func['Curtailment [kW]'], operator.target_func['Curtailment [kW]'])